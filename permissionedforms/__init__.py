@@ -1 +1,3 @@
 from .forms import *  # noqa
+from .formsets import *  # noqa
+from .permissions import *  # noqa
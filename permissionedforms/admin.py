@@ -0,0 +1,155 @@
+import weakref
+from contextvars import ContextVar
+from functools import partial
+
+from django.contrib.admin.options import BaseModelAdmin
+from django.contrib.admin.utils import flatten_fieldsets
+from django.utils.hashable import make_hashable
+
+from .cache import LRUCache
+from .forms import PermissionedModelForm
+
+# ModelAdmin methods that build form fields, and may customise them for the request's user
+FORMFIELD_HOOKS = [
+    "formfield_for_dbfield",
+    "formfield_for_choice_field",
+    "formfield_for_foreignkey",
+    "formfield_for_manytomany",
+]
+
+
+# The user of the admin view currently being processed, set by PermissionedModelAdminMixin
+current_admin_user = ContextVar("permissionedforms_current_admin_user", default=None)
+
+
+class CurrentAdminUserFormMixin:
+    """
+    Form mixin that defaults the `for_user` argument to the user of the admin view currently
+    being processed, so that admin form classes can be shared between users
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("for_user", current_admin_user.get())
+        super().__init__(*args, **kwargs)
+
+
+class PermissionedModelAdminMixin:
+    """
+    Mixin for django.contrib.admin.ModelAdmin to use a PermissionedModelForm, constructed with
+    `for_user` set to the current user. Fields that the user lacks permission for are also
+    removed from the fieldsets returned by get_fieldsets.
+
+    The form classes built by get_form are cached per admin instance, keyed by the value returned
+    from get_form_cache_key; the number of classes kept is set by `form_class_cache_size`. As
+    the classes are shared between requests, they must not be modified; the user is supplied to
+    the form from the `current_admin_user` context variable, which is set for the duration of
+    changeform_view (and so of add_view and change_view).
+    """
+
+    form = PermissionedModelForm
+    form_class_cache_size = 128
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.form_class_cache = LRUCache(self.form_class_cache_size)
+        if not issubclass(self.form, CurrentAdminUserFormMixin):
+            self.form = type(self.form)(
+                self.form.__name__,
+                (CurrentAdminUserFormMixin, self.form),
+                {"__module__": self.form.__module__},
+            )
+
+    def changeform_view(self, request, *args, **kwargs):
+        token = current_admin_user.set(getattr(request, "user", None))
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        finally:
+            current_admin_user.reset(token)
+
+    def get_form_cache_key(self, request, obj=None, change=False, **kwargs):
+        """
+        Return a hashable key identifying the form class that get_form will build for these
+        arguments, or None to build it without caching. The default implementation covers the
+        get_form arguments, the excluded and read-only fields for obj, and the user's
+        permissions, which determine the change permission and the related object links that
+        the admin adds to widgets. If any of the `formfield_for_*` methods are overridden, the
+        user's primary key is also included, as these may customise fields (such as filtering a
+        queryset) per user. Admins that customise the form class according to anything else in
+        the request should override this to include it.
+        """
+        user = getattr(request, "user", None)
+        get_all_permissions = getattr(user, "get_all_permissions", None)
+        overrides_formfield_hooks = any(
+            getattr(type(self), name) is not getattr(BaseModelAdmin, name)
+            for name in FORMFIELD_HOOKS
+        )
+        try:
+            cache_key = make_hashable(
+                (
+                    change,
+                    kwargs,
+                    self.get_exclude(request, obj),
+                    self.get_readonly_fields(request, obj),
+                    bool(change and user and self.has_change_permission(request, obj)),
+                    bool(
+                        getattr(user, "is_active", False)
+                        and getattr(user, "is_superuser", False)
+                    ),
+                    frozenset(get_all_permissions()) if get_all_permissions else None,
+                    getattr(user, "pk", None) if overrides_formfield_hooks else None,
+                )
+            )
+            hash(cache_key)
+        except TypeError:
+            return None
+        return cache_key
+
+    def get_form(self, request, obj=None, change=False, **kwargs):
+        if "fields" not in kwargs:
+            kwargs["fields"] = flatten_fieldsets(self.get_fieldsets(request, obj))
+
+        cache_key = self.get_form_cache_key(request, obj, change, **kwargs)
+        form_class = None
+        if cache_key is not None:
+            form_class = self.form_class_cache.get(cache_key)
+        if form_class is None:
+            if cache_key is not None and "formfield_callback" not in kwargs:
+                # The callback is kept on the form class, so refer to the request weakly, so that
+                # the cached class does not keep it (and its data and session) alive
+                kwargs["formfield_callback"] = partial(
+                    self.formfield_for_dbfield, request=weakref.proxy(request)
+                )
+            form_class = super().get_form(request, obj, change, **kwargs)
+            if cache_key is not None:
+                self.form_class_cache.set(cache_key, form_class)
+
+        return form_class
+
+    def get_fieldsets(self, request, obj=None):
+        fieldsets = super().get_fieldsets(request, obj)
+        user = getattr(request, "user", None)
+        if user is None:
+            return fieldsets
+
+        # Find the denied fields from the form class, without constructing a form
+        form_class = self._get_form_for_get_fields(request, obj)
+        denied_field_names = set(form_class.base_fields).difference(
+            form_class.get_permitted_fields(user, obj)
+        )
+        if not denied_field_names:
+            return fieldsets
+
+        filtered_fieldsets = []
+        for name, options in fieldsets:
+            fields = []
+            for field in options.get("fields", ()):
+                if isinstance(field, (list, tuple)):
+                    # fields to be displayed on one line
+                    field = tuple(f for f in field if f not in denied_field_names)
+                    if field:
+                        fields.append(field)
+                elif field not in denied_field_names:
+                    fields.append(field)
+            if fields:
+                filtered_fieldsets.append((name, {**options, "fields": fields}))
+        return filtered_fieldsets
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class PermissionedFormsConfig(AppConfig):
+    name = "permissionedforms"
+    verbose_name = "Permissioned forms"
+
+    def ready(self):
+        if getattr(settings, "PERMISSIONEDFORMS_WARM_UP", False):
+            from .warmup import warm_up
+
+            warm_up()
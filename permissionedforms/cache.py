@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import caches
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe, least-recently-used cache. Values of None cannot be cached, as `get`
+    uses None to indicate a miss.
+
+    Reads do not wait on the lock: entries are looked up with a single dict access, and are only
+    moved to the end of the eviction order if no other thread holds the lock at the time, so the
+    eviction order is approximate under contention. Writes and evictions are made while holding
+    the lock.
+
+    Hit and miss counts are recorded, and are reset along with the cached entries by `clear()`.
+    The counts are not updated atomically, so they may undercount under concurrent use.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value cached for key, or None if there is none"""
+        # clear() replaces the dict rather than emptying it, so take a consistent reference
+        entries = self._entries
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self._lock.acquire(blocking=False):
+            try:
+                entries.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread since the lookup
+                pass
+            finally:
+                self._lock.release()
+        return value
+
+    def set(self, key, value):
+        """Cache value for key, discarding the least recently used entry if the cache is full"""
+        if not self.maxsize:
+            return
+        with self._lock:
+            entries = self._entries
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def clear(self):
+        """Discard all cached entries and reset the hit and miss counts"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def __contains__(self, key):
+        # Does not count as a hit or miss, or affect the order of eviction
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FieldLayoutCache(LRUCache):
+    """
+    An LRUCache mapping a permission signature - the set of relevant permissions that a user has
+    been granted - to the field layout that results from it. Each permissioned form class has its
+    own instance, available as `_meta.field_layout_cache`.
+    """
+
+
+class SharedFieldLayoutCache(FieldLayoutCache):
+    """
+    A FieldLayoutCache backed by one of Django's configured caches, so that field layouts worked
+    out by one process are available to all others sharing that cache. The local LRU cache is
+    consulted first, so that the shared cache is only queried for layouts that this process has
+    not seen; shared_hits and shared_misses count the results of these queries.
+
+    Keys are built from `namespace` - which identifies the form class and a hash of its
+    field_permissions schema, so that a deployment that changes the schema does not see stale
+    layouts - the permission signature, and a version number held in the shared cache, which
+    can be incremented with `bump_shared_layout_cache_version` to invalidate all entries.
+    """
+
+    def __init__(self, cache_alias, namespace, maxsize=128):
+        super().__init__(maxsize)
+        self.cache_alias = cache_alias
+        self.namespace = namespace
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias]
+
+    def make_shared_key(self, key, version):
+        signature = hashlib.sha1("\n".join(sorted(key)).encode()).hexdigest()
+        return "permissionedforms:layout:%s:%s:%s" % (
+            version,
+            self.namespace,
+            signature,
+        )
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None:
+            return value
+
+        shared_cache = self.shared_cache
+        version = get_shared_layout_cache_version(shared_cache)
+        value = shared_cache.get(self.make_shared_key(key, version))
+        if value is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        value = tuple(value)
+        super().set(key, value)
+        return value
+
+    def set(self, key, value):
+        super().set(key, value)
+        shared_cache = self.shared_cache
+        version = get_shared_layout_cache_version(shared_cache)
+        shared_cache.set(self.make_shared_key(key, version), list(value))
+
+    def clear(self):
+        """
+        Discard all locally cached entries and reset the hit and miss counts. Entries in the
+        shared cache are unaffected; use `bump_shared_layout_cache_version` to invalidate them.
+        """
+        super().clear()
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+
+SHARED_LAYOUT_CACHE_VERSION_KEY = "permissionedforms:layout:version"
+
+
+def _new_version():
+    # Versions are seeded from the clock, so that if the version key is evicted, the new version
+    # does not coincide with one used previously
+    return int(time.time() * 1000)
+
+
+def get_shared_layout_cache_version(shared_cache):
+    return shared_cache.get_or_set(
+        SHARED_LAYOUT_CACHE_VERSION_KEY, _new_version, timeout=None
+    )
+
+
+def get_schema_hash(field_names, field_permissions):
+    """
+    Return a hash identifying a form's field layout schema: the names of its fields, in order,
+    and the field_permissions rules that determine which of them are removed
+    """
+    schema = repr((list(field_names), sorted(field_permissions.items())))
+    return hashlib.sha1(schema.encode()).hexdigest()
+
+
+def bump_shared_layout_cache_version(cache_alias="default"):
+    """
+    Invalidate all field layouts held in the given shared cache, by incrementing the version
+    number included in their keys
+    """
+    shared_cache = caches[cache_alias]
+    try:
+        shared_cache.incr(SHARED_LAYOUT_CACHE_VERSION_KEY)
+    except ValueError:
+        # The version key has been evicted, so start a new one
+        shared_cache.set(SHARED_LAYOUT_CACHE_VERSION_KEY, _new_version(), timeout=None)
@@ -1,4 +1,37 @@
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from weakref import WeakSet
+
 from django import forms
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.hashable import make_hashable
+from django.utils.translation import get_language
+
+from .cache import FieldLayoutCache, LRUCache, SharedFieldLayoutCache, get_schema_hash
+from .permissions import (
+    PermissionExpression,
+    aresolve_permissions,
+    default_permission_resolver,
+    resolve_permissions_counted,
+)
+from .signals import form_permissions_applied
+
+__all__ = [
+    "Options",
+    "OptionCollectingMetaclass",
+    "PermissionedFormOptionsMixin",
+    "FormsetPermissionsOptionsMixin",
+    "PermissionedFormOptions",
+    "FormMetaclass",
+    "PermissionedFormMetaclass",
+    "PermissionedForm",
+    "ValidationResult",
+    "PermissionedModelFormOptions",
+    "PermissionedModelFormMetaclass",
+    "PermissionedModelForm",
+    "permissioned_modelform_factory",
+]
 
 
 class Options:
@@ -12,6 +45,12 @@ class Options:
     configuration options can be defined as mixins and collectively merged in to either Options or
     another base class with the same interface such as django.forms.models.ModelFormOptions,
     to arrive at a final class that recognises the desired set of options.
+
+    Mixins should read their options in an `init_options(self, options)` method, called from
+    their `__init__` after the superclass constructor. This allows OptionCollectingMetaclass to
+    extend an options object that a base metaclass has already built (such as the
+    ModelFormOptions built by ModelFormMetaclass) by running only the mixins' `init_options`
+    methods, rather than building the options again from scratch.
     """
 
     def __init__(self, options=None):
@@ -24,6 +63,13 @@ class OptionCollectingMetaclass(type):
     OptionCollectingMetaclass defines an inner Meta class and an `options_class` attribute
     specifying an Options class, an Options object will be created from it and set as the class
     attribute `_meta`.
+
+    If a base metaclass has already set `_meta` to an instance of one of the classes that
+    options_class inherits from, that instance's attributes are carried over and only the
+    `init_options` methods of the additional classes are run, so that the base options are
+    processed once. If any of the additional classes defines `__init__` without `init_options`,
+    the options are instead built in full, and the base options' attributes are copied over
+    the result.
     """
 
     options_class = None
@@ -31,16 +77,278 @@ class OptionCollectingMetaclass(type):
     def __new__(mcs, name, bases, attrs):
         new_class = super().__new__(mcs, name, bases, attrs)
         if mcs.options_class:
-            new_class._meta = mcs.options_class(getattr(new_class, "Meta", None))
+            new_class._meta = mcs.build_options(new_class)
         return new_class
 
+    @classmethod
+    def build_options(mcs, new_class):
+        options_class = mcs.options_class
+        meta = getattr(new_class, "Meta", None)
+        base_opts = new_class.__dict__.get("_meta")
+        base_classes = tuple(
+            klass for klass in options_class.__mro__[1:] if klass is not object
+        )
+        if base_opts is None or not isinstance(base_opts, base_classes):
+            return options_class(meta)
+
+        additional_classes = [
+            klass
+            for klass in reversed(options_class.__mro__)
+            if not isinstance(base_opts, klass)
+        ]
+        if any(
+            "__init__" in vars(klass) and "init_options" not in vars(klass)
+            for klass in additional_classes
+        ):
+            # A class that reads its options in __init__ can only be handled by building the
+            # options from scratch. The base options' attributes are then carried over, so that
+            # any adjustments the base metaclass made to them are kept.
+            opts = options_class(meta)
+            opts.__dict__.update(base_opts.__dict__)
+            return opts
+
+        opts = options_class.__new__(options_class)
+        opts.__dict__.update(base_opts.__dict__)
+        for klass in additional_classes:
+            init_options = vars(klass).get("init_options")
+            if init_options:
+                init_options(opts, meta)
+        return opts
+
+
+def merge_inherited_permissions(form_class, option_name):
+    """
+    Return an immutable mapping that merges the permission mappings declared as option_name on
+    the inner Meta classes along form_class's MRO. In the same way that DeclarativeFieldsMetaclass
+    collects fields, each class's own Meta declarations are applied in reverse MRO order, so that
+    classes earlier in the MRO take precedence. Declaring an entry with a value of None removes
+    any entry for that name declared by classes later in the MRO.
+    """
+    merged = {}
+    for klass in reversed(form_class.__mro__):
+        meta = klass.__dict__.get("Meta")
+        declared_permissions = vars(meta).get(option_name) if meta else None
+        for name, perm in (declared_permissions or {}).items():
+            if perm is None:
+                merged.pop(name, None)
+            else:
+                merged[name] = perm
+
+    return MappingProxyType(merged)
+
+
+class FieldPermissionIndex:
+    """
+    A compiled form of the `field_permissions` option, built once when the form class is created.
+    Holds the set of distinct permissions that need to be looked up, and an inverse index from
+    each permission to the names of the fields it gates, so that filtering the fields for a user
+    costs one set operation per distinct permission rather than one test per field.
+
+    Fields gated by a PermissionExpression are grouped by expression, and each distinct
+    expression is compiled once into a test function, stored in `expression_tests` alongside the
+    names of the fields it gates.
+
+    The index is immutable once built, so that it can be shared between threads without locking.
+    """
+
+    def __init__(self, field_permissions=None):
+        fields_by_permission = {}
+        fields_by_expression = {}
+        for field_name, perm in (field_permissions or {}).items():
+            if isinstance(perm, PermissionExpression):
+                fields_by_expression.setdefault(perm, set()).add(field_name)
+            else:
+                fields_by_permission.setdefault(perm, set()).add(field_name)
+
+        self.fields_by_permission = MappingProxyType(
+            {
+                perm: frozenset(field_names)
+                for perm, field_names in fields_by_permission.items()
+            }
+        )
+        self.expression_tests = tuple(
+            (expression.compile(), frozenset(field_names))
+            for expression, field_names in fields_by_expression.items()
+        )
+        self.permissions = frozenset(self.fields_by_permission).union(
+            *(expression.permissions for expression in fields_by_expression)
+        )
+
+    def get_denied_names(self, granted_permissions):
+        """
+        Return the set of names that are gated by a permission not in granted_permissions, or by
+        an expression that granted_permissions does not satisfy
+        """
+        denied_names = set()
+        for perm, field_names in self.fields_by_permission.items():
+            if perm not in granted_permissions:
+                denied_names |= field_names
+        for test, field_names in self.expression_tests:
+            if not test(granted_permissions):
+                denied_names |= field_names
+        return denied_names
+
 
 class PermissionedFormOptionsMixin:
-    """Handles the field_permissions option for PermissionedForm"""
+    """
+    Handles the field_permissions, permission_resolver, object_permissions,
+    disable_denied_fields, field_layout_cache_size, field_layout_cache_alias and
+    render_cache_size options for PermissionedForm
+    """
 
     def __init__(self, options=None):
         super().__init__(options)
+        PermissionedFormOptionsMixin.init_options(self, options)
+
+    def init_options(self, options):
         self.field_permissions = getattr(options, "field_permissions", None)
+        self.permission_resolver = getattr(
+            options, "permission_resolver", default_permission_resolver
+        )
+        self.object_permissions = getattr(options, "object_permissions", False)
+        # True to disable all denied fields rather than removing them, or a collection of the
+        # names of the fields to disable
+        self.disable_denied_fields = getattr(options, "disable_denied_fields", False)
+        if self.disable_denied_fields and self.disable_denied_fields is not True:
+            self.disable_denied_fields = frozenset(self.disable_denied_fields)
+        self.field_layout_cache_size = getattr(options, "field_layout_cache_size", 128)
+        # The alias of a Django cache to share field layouts through, if any
+        self.field_layout_cache_alias = getattr(
+            options, "field_layout_cache_alias", None
+        )
+        self.render_cache_size = getattr(options, "render_cache_size", 0)
+        self.field_permission_index = FieldPermissionIndex()
+        self.disabled_field_permission_index = FieldPermissionIndex()
+        self.field_layout_cache = FieldLayoutCache(self.field_layout_cache_size)
+        self.render_cache = LRUCache(self.render_cache_size)
+        # The set of all permissions that need to be looked up when instantiating the form
+        self.required_permissions = frozenset()
+
+    def compile_field_permissions(self, form_class, declared_field_names=()):
+        """
+        Build field_permission_index (for fields that are removed when denied) and
+        disabled_field_permission_index (for fields that are disabled when denied, as selected by
+        disable_denied_fields) from field_permissions, once form_class's base_fields are known.
+        Any of declared_field_names (the names given in the form class's own Meta) that do
+        not exist on the form are reported as ImproperlyConfigured; other unknown names are
+        skipped, so that a subclass can remove a field that an inherited entry refers to.
+        """
+        field_perms = self.field_permissions or {}
+        unknown_field_names = [
+            field_name
+            for field_name in field_perms
+            if field_name not in form_class.base_fields
+        ]
+        if unknown_field_names:
+            declared_unknown_field_names = [
+                field_name
+                for field_name in unknown_field_names
+                if field_name in declared_field_names
+            ]
+            if declared_unknown_field_names:
+                raise ImproperlyConfigured(
+                    "field_permissions for %s refers to unknown field(s): %s"
+                    % (form_class.__name__, ", ".join(declared_unknown_field_names))
+                )
+            field_perms = {
+                field_name: perm
+                for field_name, perm in field_perms.items()
+                if field_name in form_class.base_fields
+            }
+
+        if self.disable_denied_fields is True:
+            disabled_field_names = set(field_perms)
+        else:
+            disabled_field_names = set(self.disable_denied_fields or ())
+            unknown_disabled_names = sorted(
+                disabled_field_names.difference(self.field_permissions or {})
+            )
+            if unknown_disabled_names:
+                raise ImproperlyConfigured(
+                    "disable_denied_fields for %s refers to field(s) without "
+                    "field_permissions: %s"
+                    % (form_class.__name__, ", ".join(unknown_disabled_names))
+                )
+
+        removed_field_perms = {
+            field_name: perm
+            for field_name, perm in field_perms.items()
+            if field_name not in disabled_field_names
+        }
+        self.field_permission_index = FieldPermissionIndex(removed_field_perms)
+        self.disabled_field_permission_index = FieldPermissionIndex(
+            {
+                field_name: perm
+                for field_name, perm in field_perms.items()
+                if field_name in disabled_field_names
+            }
+        )
+        if self.field_layout_cache_alias:
+            namespace = "%s.%s:%s" % (
+                form_class.__module__,
+                form_class.__qualname__,
+                get_schema_hash(form_class.base_fields, removed_field_perms),
+            )
+            self.field_layout_cache = SharedFieldLayoutCache(
+                self.field_layout_cache_alias, namespace, self.field_layout_cache_size
+            )
+
+        self.required_permissions = (
+            self.required_permissions
+            | self.field_permission_index.permissions
+            | self.disabled_field_permission_index.permissions
+        )
+
+
+class FormsetPermissionsOptionsMixin:
+    """
+    Handles the formset_permissions option, for use alongside PermissionedFormOptionsMixin on
+    form classes that build child formsets into a `formsets` dict, such as modelcluster's
+    ClusterForm. formset_permissions maps formset names to permission codenames, in the same way
+    that field_permissions does for fields.
+    """
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        FormsetPermissionsOptionsMixin.init_options(self, options)
+
+    def init_options(self, options):
+        self.formset_permissions = getattr(options, "formset_permissions", None)
+        self.formset_permission_index = FieldPermissionIndex()
+
+    def compile_formset_permissions(self, form_class, declared_formset_names=()):
+        """
+        Build formset_permission_index from formset_permissions, checking the formset names
+        against the form class's `formsets` in the same way as compile_field_permissions
+        """
+        formset_perms = self.formset_permissions or {}
+        formsets = getattr(form_class, "formsets", None) or {}
+        unknown_formset_names = [
+            formset_name
+            for formset_name in formset_perms
+            if formset_name not in formsets
+        ]
+        if unknown_formset_names:
+            declared_unknown_formset_names = [
+                formset_name
+                for formset_name in unknown_formset_names
+                if formset_name in declared_formset_names
+            ]
+            if declared_unknown_formset_names:
+                raise ImproperlyConfigured(
+                    "formset_permissions for %s refers to unknown formset(s): %s"
+                    % (form_class.__name__, ", ".join(declared_unknown_formset_names))
+                )
+            formset_perms = {
+                formset_name: perm
+                for formset_name, perm in formset_perms.items()
+                if formset_name in formsets
+            }
+
+        self.formset_permission_index = FieldPermissionIndex(formset_perms)
+        self.required_permissions = (
+            self.required_permissions | self.formset_permission_index.permissions
+        )
 
 
 class PermissionedFormOptions(PermissionedFormOptionsMixin, Options):
@@ -49,15 +357,53 @@ class PermissionedFormOptions(PermissionedFormOptionsMixin, Options):
 
 FormMetaclass = type(forms.Form)
 
+# A result yielded by PermissionedForm.validate_many
+ValidationResult = namedtuple(
+    "ValidationResult", ["form", "is_valid", "cleaned_data", "errors"]
+)
+
+# Every permissioned form class that has been defined. Classes are held by weak reference, so
+# that dynamically created ones can still be garbage collected.
+form_class_registry = WeakSet()
+
 
 class PermissionedFormMetaclass(OptionCollectingMetaclass, FormMetaclass):
     """
     Extends the django.forms.Form metaclass with support for an inner `class Meta` that accepts
-    a `field_permissions` configuration option
+    `field_permissions`, `permission_resolver`, `object_permissions` and
+    `field_layout_cache_size` configuration options. The `field_permissions` option (and
+    `formset_permissions`, where the options class supports it) is compiled into a
+    FieldPermissionIndex when the class is created, at which point any references to nonexistent
+    fields are reported. The class is then added to `form_class_registry`.
     """
 
     options_class = PermissionedFormOptions
 
+    def __new__(mcs, name, bases, attrs):
+        new_class = super().__new__(mcs, name, bases, attrs)
+        # The Meta options object only sees the Meta class visible on new_class, which may be
+        # inherited unchanged or may replace the parent's entirely. Merge the declarations made
+        # by the Meta of each class along the MRO instead; the names declared by this class's own
+        # Meta (if any) are checked against its fields.
+        own_meta_options = vars(attrs["Meta"]) if "Meta" in attrs else {}
+        opts = new_class._meta
+
+        declared_field_perms = own_meta_options.get("field_permissions") or {}
+        opts.field_permissions = merge_inherited_permissions(
+            new_class, "field_permissions"
+        )
+        opts.compile_field_permissions(new_class, declared_field_perms)
+
+        if isinstance(opts, FormsetPermissionsOptionsMixin):
+            declared_formset_perms = own_meta_options.get("formset_permissions") or {}
+            opts.formset_permissions = merge_inherited_permissions(
+                new_class, "formset_permissions"
+            )
+            opts.compile_formset_permissions(new_class, declared_formset_perms)
+
+        form_class_registry.add(new_class)
+        return new_class
+
 
 class PermissionedForm(forms.Form, metaclass=PermissionedFormMetaclass):
     """
@@ -65,17 +411,404 @@ class PermissionedForm(forms.Form, metaclass=PermissionedFormMetaclass):
     indicating the user the form will be presented to.
 
     Any fields named in the `field_permissions` dict in Meta will apply a permission test on the
-    named permission using `User.has_perm`; if the user lacks that permission, the field will be
-    omitted from the form.
+    named permission; if the user lacks that permission, the field will be omitted from the form.
+    Permissions are looked up through the PermissionResolver given as `permission_resolver` in
+    Meta, which by default fetches the user's full set of permissions once and tests every field
+    against it. The resulting field layouts are cached per form class, keyed by the set of
+    relevant permissions granted; the size of this cache is set by `field_layout_cache_size`.
+
+    If `object_permissions` is set to True in Meta, the `instance` passed to the form (if any) is
+    passed on to the permission tests, as in `User.has_perm(perm, instance)`, to allow
+    object-level permission backends to be used.
+
+    If `disable_denied_fields` is set in Meta - either to True, or to a list of field names -
+    the affected fields are kept on the form but marked as disabled when the user lacks the
+    permission, so that their values are displayed but any submitted value is ignored. Disabled
+    fields keep their initial values in cleaned_data, but are never written back to a model
+    instance.
+
+    On form classes whose options include FormsetPermissionsOptionsMixin, any child formsets
+    named in the `formset_permissions` dict in Meta are likewise omitted from `formsets` if the
+    user lacks the named permission.
+
+    Where several forms are built for the same user, the permissions can be looked up once with
+    `get_granted_permissions` and passed to each form as the `granted_permissions` keyword
+    argument; PermissionedBaseFormSet does this for its child forms.
     """
 
-    def __init__(self, *args, for_user=None, **kwargs):
+    def __init__(self, *args, for_user=None, granted_permissions=None, **kwargs):
+        apply_permissions = bool(for_user and self._meta.required_permissions)
+        # Only gather statistics when something is listening for them
+        instrument = apply_permissions and bool(form_permissions_applied.receivers)
+        if instrument:
+            start_time = time.perf_counter()
+            permission_checks = 0
+
+        if apply_permissions:
+            if granted_permissions is None:
+                obj = kwargs.get("instance") if self._meta.object_permissions else None
+                (
+                    granted_permissions,
+                    permission_checks,
+                ) = self._get_granted_permissions_counted(for_user, obj)
+
+            # Filter base_fields before the superclass constructor deep-copies them into
+            # self.fields, so that fields which are about to be omitted are never copied.
+            # Shadowing the class attribute with an instance attribute leaves the class-wide
+            # definition untouched.
+            base_fields, layout_cache_hit = self._get_permitted_base_fields(
+                granted_permissions
+            )
+            if base_fields is not self.base_fields:
+                self.base_fields = base_fields
+
+        if instrument:
+            # Time spent in the superclass constructor is not counted
+            duration = time.perf_counter() - start_time
+
         super().__init__(*args, **kwargs)
+
+        if instrument:
+            start_time = time.perf_counter()
+
+        if apply_permissions and self._meta.disabled_field_permission_index.permissions:
+            # self.fields holds this instance's own copies of the fields, so these can be
+            # modified without affecting other instances
+            index = self._meta.disabled_field_permission_index
+            self._permission_disabled_fields = index.get_denied_names(
+                granted_permissions
+            )
+            for field_name in self._permission_disabled_fields:
+                field = self.fields[field_name]
+                field.disabled = True
+                # The user cannot supply a value, so a missing one should not fail validation
+                field.required = False
+
+        if apply_permissions and isinstance(self._meta, FormsetPermissionsOptionsMixin):
+            # Child formsets do not evaluate their querysets or build their forms until they
+            # are accessed, so discarding them here avoids that work
+            index = self._meta.formset_permission_index
+            for formset_name in index.get_denied_names(granted_permissions):
+                del self.formsets[formset_name]
+
+        if instrument:
+            duration += time.perf_counter() - start_time
+            form_permissions_applied.send(
+                sender=type(self),
+                form=self,
+                user=for_user,
+                permission_checks=permission_checks,
+                removed_fields=[
+                    field_name
+                    for field_name in type(self).base_fields
+                    if field_name not in self.base_fields
+                ],
+                disabled_fields=sorted(self._permission_disabled_fields),
+                layout_cache_hit=layout_cache_hit,
+                duration=duration,
+            )
+
+    # Names of the fields that were disabled because the user lacks the permission for them
+    _permission_disabled_fields = frozenset()
+
+    # Values of permission-disabled fields held back from cleaned_data during _post_clean
+    _withheld_cleaned_data = {}
+    _withholding_disabled_fields = False
+
+    def _withhold_disabled_fields(self):
+        self._withheld_cleaned_data = {
+            field_name: self.cleaned_data.pop(field_name)
+            for field_name in self._permission_disabled_fields
+            if field_name in self.cleaned_data
+        }
+
+    def _restore_disabled_fields(self):
+        for field_name, value in self._withheld_cleaned_data.items():
+            if field_name not in self._errors:
+                self.cleaned_data[field_name] = value
+        self._withheld_cleaned_data = {}
+
+    def _post_clean(self):
+        # Disabled fields keep their initial values in cleaned_data, as in Django, but are held
+        # back while a ModelForm's construct_instance runs, so that they are never written to
+        # the instance
+        if not self._permission_disabled_fields:
+            return super()._post_clean()
+        self._withholding_disabled_fields = True
+        try:
+            super()._post_clean()
+        finally:
+            self._withholding_disabled_fields = False
+            self._restore_disabled_fields()
+
+    def _get_validation_exclusions(self):
+        # Work out the exclusions with the disabled fields' values in place, so that they are
+        # validated (including unique checks) as they would be without permissions applied.
+        # ModelForm._post_clean calls this before construct_instance, so the values are then
+        # held back until _post_clean completes.
+        self._restore_disabled_fields()
+        exclude = super()._get_validation_exclusions()
+        if self._withholding_disabled_fields:
+            self._withhold_disabled_fields()
+        return exclude
+
+    def _save_m2m(self):
+        if not self._permission_disabled_fields:
+            return super()._save_m2m()
+        self._withhold_disabled_fields()
+        try:
+            super()._save_m2m()
+        finally:
+            self._restore_disabled_fields()
+
+    def render(self, template_name=None, context=None, renderer=None):
+        """
+        Render the form as HTML (Django 4.0 and above). If `render_cache_size` is set in Meta,
+        the output for unbound forms is cached in `_meta.render_cache`, keyed by the template,
+        the fields present with their initial values and choices, and the form's initial data
+        and other rendering options.
+        """
+        cache_key = None
+        if self._meta.render_cache_size and context is None and not self.is_bound:
+            cache_key = self._get_render_cache_key(template_name, renderer)
+
+        if cache_key is not None:
+            html = self._meta.render_cache.get(cache_key)
+            if html is not None:
+                return html
+
+        html = super().render(
+            template_name=template_name, context=context, renderer=renderer
+        )
+        if cache_key is not None:
+            self._meta.render_cache.set(cache_key, html)
+        return html
+
+    def _get_render_cache_key(self, template_name, renderer):
+        """
+        Return a key identifying the output of rendering this (unbound) form, or None if it
+        cannot be cached
+        """
+        field_states = []
+        for field in self.fields.values():
+            if callable(field.initial):
+                # Callable initial values, such as the current time, may differ on each render
+                return None
+            if isinstance(field, forms.ModelChoiceField):
+                # Choices come from the database, so may differ on each render
+                return None
+            choices = getattr(field, "choices", None)
+            if choices is not None and not isinstance(choices, (list, tuple)):
+                # Callable or iterator choices may differ on each render
+                return None
+            # Fields are this instance's own copies, so may have been given their own initial
+            # values or choices, such as ones specific to the user
+            field_states.append((field.initial, choices))
+
+        try:
+            initial = make_hashable((self.initial, field_states))
+            hash(initial)
+        except TypeError:
+            return None
+
+        return (
+            template_name or self.template_name,
+            renderer or self.renderer,
+            get_language(),
+            tuple(self.fields),
+            frozenset(self._permission_disabled_fields),
+            self.prefix,
+            self.auto_id,
+            self.label_suffix,
+            self.use_required_attribute,
+            initial,
+        )
+
+    @classmethod
+    def get_permitted_fields(cls, user, obj=None):
+        """
+        Return a list of the names of the fields that a form for `user` would contain, in form
+        order, without constructing the form. Fields that would be disabled under
+        `disable_denied_fields` are included. If `object_permissions` is set in Meta, the
+        permissions are tested against obj, as they would be against the form's instance. As
+        with the `for_user` argument, passing a user of None applies no filtering.
+        """
+        if not (user and cls._meta.field_permission_index.permissions):
+            return list(cls.base_fields)
+
+        if not cls._meta.object_permissions:
+            obj = None
+        return list(
+            cls._get_permitted_field_names(cls.get_granted_permissions(user, obj))
+        )
+
+    @classmethod
+    def get_granted_permissions(cls, for_user, obj=None):
+        """
+        Look up which of the permissions named in field_permissions (and formset_permissions,
+        where supported) are held by for_user, on the object obj if given. The result can be
+        passed as the `granted_permissions` argument when constructing forms for the same user,
+        so that they share a single lookup.
+        """
+        granted_permissions, _ = cls._get_granted_permissions_counted(for_user, obj)
+        return granted_permissions
+
+    @classmethod
+    def _get_granted_permissions_counted(cls, for_user, obj=None):
+        """
+        As get_granted_permissions, but return a tuple of the granted permissions and the
+        number of permissions that were passed to the permission resolver
+        """
+        if not cls._meta.required_permissions:
+            return frozenset(), 0
+
+        return resolve_permissions_counted(
+            cls._meta.permission_resolver, for_user, cls._meta.required_permissions, obj
+        )
+
+    @classmethod
+    async def _aget_granted_permissions(cls, for_user, obj=None):
+        """Asynchronous version of get_granted_permissions"""
+        if not cls._meta.required_permissions:
+            return frozenset()
+
+        return await aresolve_permissions(
+            cls._meta.permission_resolver, for_user, cls._meta.required_permissions, obj
+        )
+
+    @classmethod
+    def _get_granted_permissions_for_objects(cls, for_user, objs):
+        """
+        Look up the permissions held by for_user on each of objs in a single call to the
+        permission resolver, returning a list of granted permission sets in the same order
+        """
+        if not cls._meta.required_permissions:
+            return [frozenset() for obj in objs]
+
+        return cls._meta.permission_resolver.get_granted_permissions_for_objects(
+            for_user, cls._meta.required_permissions, objs
+        )
+
+    @classmethod
+    def validate_many(cls, data_rows, for_user=None, **kwargs):
+        """
+        Validate each of the data dicts in the iterable data_rows against this form, as filtered
+        for for_user, yielding a ValidationResult for each in turn. The user's permissions are
+        looked up once, and a single form is built and rebound to each row in turn, so that its
+        fields are only copied once. Rows are consumed and validated lazily, so a generator can
+        be passed to validate large numbers of rows in constant memory.
+
+        As the form is reused, `result.form` is only valid until the next result is requested;
+        `cleaned_data` and `errors` are kept for each row. Forms with child formsets (such as
+        ClusterForm) are built afresh for each row, as the formsets are bound on construction.
+
+        Any further keyword arguments are passed to the form; for a ModelForm, this means that
+        `instance` should not be passed, so that each row gets its own.
+        """
+        granted_permissions = None
+        if for_user:
+            granted_permissions = cls.get_granted_permissions(for_user)
+
+        form = None
+        for data in data_rows:
+            if form is None or getattr(form, "formsets", None):
+                form = cls(
+                    data,
+                    for_user=for_user,
+                    granted_permissions=granted_permissions,
+                    **kwargs,
+                )
+            else:
+                form._rebind(data)
+                if isinstance(form, forms.BaseModelForm) and "instance" not in kwargs:
+                    form.instance = cls._meta.model()
+
+            if form.is_valid():
+                yield ValidationResult(form, True, form.cleaned_data, None)
+            else:
+                yield ValidationResult(form, False, None, form.errors)
+
+    def _rebind(self, data):
+        """
+        Bind this form to a new set of data, discarding the results of any previous validation,
+        so that it can validate another row without its fields being copied again
+        """
+        self.data = {} if data is None else data
+        self.is_bound = True
+        self._errors = None
+        self._bound_fields_cache = {}
+        for attr_name in ["cleaned_data", "changed_data"]:
+            self.__dict__.pop(attr_name, None)
+
+    @classmethod
+    async def acreate(cls, *args, for_user=None, **kwargs):
+        """
+        Construct a form instance from an asynchronous context, such as an ASGI view. The user's
+        permissions are looked up through the resolver's asynchronous API, so that the event loop
+        is not blocked; for_user should be a fully-loaded user object, such as the one returned
+        by `await request.auser()`.
+        """
+        granted_permissions = None
         if for_user:
-            field_perms = self._meta.field_permissions or {}
-            for field_name, perm in field_perms.items():
-                if not for_user.has_perm(perm):
-                    del self.fields[field_name]
+            obj = kwargs.get("instance") if cls._meta.object_permissions else None
+            granted_permissions = await cls._aget_granted_permissions(for_user, obj)
+        return cls(
+            *args, for_user=for_user, granted_permissions=granted_permissions, **kwargs
+        )
+
+    @classmethod
+    def _get_permitted_base_fields(cls, granted_perms):
+        """
+        Return a tuple of the subset of the class's base_fields that are permitted by the
+        permissions in granted_perms, preserving their order, and whether the field layout was
+        found in the field layout cache (None if the cache was not consulted). If no fields are
+        denied, base_fields is returned unchanged.
+        """
+        if not cls._meta.field_permission_index.permissions:
+            return cls.base_fields, None
+
+        field_names, layout_cache_hit = cls._lookup_permitted_field_names(granted_perms)
+        if len(field_names) == len(cls.base_fields):
+            return cls.base_fields, layout_cache_hit
+
+        base_fields = {
+            field_name: cls.base_fields[field_name] for field_name in field_names
+        }
+        return base_fields, layout_cache_hit
+
+    @classmethod
+    def _get_permitted_field_names(cls, granted_perms):
+        """
+        Return a tuple of the names of the fields in base_fields that are permitted by the
+        permissions in granted_perms, in form order. Results are cached in the class's
+        field_layout_cache, keyed by the set of relevant permissions granted.
+        """
+        field_names, _ = cls._lookup_permitted_field_names(granted_perms)
+        return field_names
+
+    @classmethod
+    def _lookup_permitted_field_names(cls, granted_perms):
+        """
+        As _get_permitted_field_names, but return a tuple of the field names and whether they
+        were found in the field layout cache (locally or, for a shared cache, in the shared
+        cache)
+        """
+        index = cls._meta.field_permission_index
+        signature = index.permissions.intersection(granted_perms)
+        field_layout_cache = cls._meta.field_layout_cache
+
+        field_names = field_layout_cache.get(signature)
+        if field_names is not None:
+            return field_names, True
+
+        denied_field_names = index.get_denied_names(signature)
+        field_names = tuple(
+            field_name
+            for field_name in cls.base_fields
+            if field_name not in denied_field_names
+        )
+        field_layout_cache.set(signature, field_names)
+        return field_names, False
 
 
 class PermissionedModelFormOptions(
@@ -83,7 +816,7 @@ class PermissionedModelFormOptions(
 ):
     """
     Options class for PermissionedModelForm; extends ModelForm's options to accept
-    `field_permissions`
+    `field_permissions` and `permission_resolver`
     """
 
 
@@ -95,10 +828,11 @@ class PermissionedModelFormMetaclass(
     PermissionedModelFormOptions in place of ModelFormOptions and thus accept the
     `field_permissions` option.
 
-    Note that because ModelForm does not participate in the OptionCollectingMetaclass logic, this
-    has the slightly hacky effect of letting ModelFormMetaclass construct a ModelFormOptions object
-    for the lifetime of ModelFormMetaclass.__new__, which we promptly throw out and recreate as a
-    PermissionedModelFormOptions object.
+    ModelForm does not participate in the OptionCollectingMetaclass logic, so ModelFormMetaclass
+    constructs a plain ModelFormOptions object for the lifetime of ModelFormMetaclass.__new__.
+    OptionCollectingMetaclass then extends this into a PermissionedModelFormOptions object
+    without processing the ModelForm options a second time, so that any adjustments
+    ModelFormMetaclass made to them (such as normalising `fields = "__all__"` to None) are kept.
     """
 
     options_class = PermissionedModelFormOptions
@@ -108,3 +842,91 @@ class PermissionedModelForm(
     PermissionedForm, forms.ModelForm, metaclass=PermissionedModelFormMetaclass
 ):
     """A ModelForm that implements the `for_user` keyword argument from PermissionedForm"""
+
+
+# Form classes generated by permissioned_modelform_factory, keyed by the factory arguments
+modelform_class_cache = LRUCache(maxsize=256)
+
+
+def permissioned_modelform_factory(
+    model,
+    form=PermissionedModelForm,
+    fields=None,
+    exclude=None,
+    formfield_callback=None,
+    widgets=None,
+    localized_fields=None,
+    labels=None,
+    help_texts=None,
+    error_messages=None,
+    field_classes=None,
+    field_permissions=None,
+):
+    """
+    Return a PermissionedModelForm subclass for the given model, as Django's modelform_factory
+    does, with the additional `field_permissions` argument. field_permissions entries are merged
+    over any that `form` defines.
+
+    Generated classes are memoized in `modelform_class_cache`, so that calling this repeatedly
+    with the same arguments (for example, on every request) only builds the class once. Calls
+    with arguments that cannot be hashed bypass the cache.
+    """
+    factory_args = (
+        model,
+        form,
+        fields,
+        exclude,
+        formfield_callback,
+        widgets,
+        localized_fields,
+        labels,
+        help_texts,
+        error_messages,
+        field_classes,
+        field_permissions,
+    )
+    try:
+        cache_key = make_hashable(factory_args)
+        hash(cache_key)
+    except TypeError:
+        cache_key = None
+
+    if cache_key is not None:
+        form_class = modelform_class_cache.get(cache_key)
+        if form_class is not None:
+            return form_class
+
+    meta_attrs = {"model": model}
+    for name, value in [
+        ("fields", fields),
+        ("exclude", exclude),
+        ("widgets", widgets),
+        ("localized_fields", localized_fields),
+        ("labels", labels),
+        ("help_texts", help_texts),
+        ("error_messages", error_messages),
+        ("field_classes", field_classes),
+        ("field_permissions", field_permissions),
+    ]:
+        if value is not None:
+            meta_attrs[name] = value
+    form_attrs = {}
+    if formfield_callback:
+        meta_attrs["formfield_callback"] = staticmethod(formfield_callback)
+        form_attrs["formfield_callback"] = formfield_callback
+
+    meta_bases = (form.Meta,) if hasattr(form, "Meta") else ()
+    form_attrs["Meta"] = type("Meta", meta_bases, meta_attrs)
+    if (
+        getattr(form_attrs["Meta"], "fields", None) is None
+        and getattr(form_attrs["Meta"], "exclude", None) is None
+    ):
+        raise ImproperlyConfigured(
+            "Calling permissioned_modelform_factory without defining 'fields' or 'exclude' "
+            "explicitly is prohibited."
+        )
+
+    form_class = type(form)(model.__name__ + "Form", (form,), form_attrs)
+    if cache_key is not None:
+        modelform_class_cache.set(cache_key, form_class)
+    return form_class
@@ -0,0 +1,102 @@
+from django.core.exceptions import ValidationError
+from django.forms.formsets import BaseFormSet, formset_factory
+from django.forms.models import BaseModelFormSet, modelformset_factory
+from django.utils.functional import cached_property
+
+from .forms import PermissionedModelForm
+
+__all__ = [
+    "PermissionedFormSetMixin",
+    "PermissionedBaseFormSet",
+    "PermissionedBaseModelFormSet",
+    "permissioned_formset_factory",
+    "permissioned_modelformset_factory",
+]
+
+
+class PermissionedFormSetMixin:
+    """
+    Formset mixin to accept an optional `for_user` keyword argument, which is passed on to every
+    form in the formset, including `empty_form`. The user's permissions are looked up once for
+    the whole formset, rather than once per form.
+    """
+
+    def __init__(self, *args, for_user=None, **kwargs):
+        self.for_user = for_user
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def granted_permissions(self):
+        return self.form.get_granted_permissions(self.for_user)
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if self.for_user:
+            kwargs["for_user"] = self.for_user
+            kwargs["granted_permissions"] = self.granted_permissions
+        return kwargs
+
+
+class PermissionedBaseFormSet(PermissionedFormSetMixin, BaseFormSet):
+    """A formset of PermissionedForms that accepts the `for_user` keyword argument"""
+
+
+class PermissionedBaseModelFormSet(PermissionedFormSetMixin, BaseModelFormSet):
+    """
+    A model formset of PermissionedModelForms that accepts the `for_user` keyword argument.
+
+    If the form has `object_permissions` enabled, the user's permissions on every object in the
+    queryset are looked up in a single call to the resolver's
+    `get_granted_permissions_for_objects` method, and each form for an existing object receives
+    the permissions for that object. Extra forms receive the user's global permissions.
+    """
+
+    @cached_property
+    def object_granted_permissions(self):
+        """A dict mapping the pk of each object in the queryset to the permissions granted on it"""
+        objs = list(self.get_queryset())
+        granted_permissions = self.form._get_granted_permissions_for_objects(
+            self.for_user, objs
+        )
+        return {obj.pk: granted for obj, granted in zip(objs, granted_permissions)}
+
+    def _get_existing_pk(self, index):
+        """
+        Return the pk of the existing object that the form at index will edit, or None. This
+        follows the logic BaseModelFormSet._construct_form uses to find the instance.
+        """
+        if not self.is_bound:
+            return self.get_queryset()[index].pk
+
+        pk_field = self.model._meta.pk
+        try:
+            pk = self.data["%s-%s" % (self.add_prefix(index), pk_field.name)]
+        except KeyError:
+            return None
+        try:
+            return self._get_to_python(pk_field)(pk)
+        except ValidationError:
+            return None
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if (
+            self.for_user
+            and self.form._meta.object_permissions
+            and index is not None
+            and index < self.initial_form_count()
+        ):
+            kwargs["granted_permissions"] = self.object_granted_permissions.get(
+                self._get_existing_pk(index), self.granted_permissions
+            )
+        return kwargs
+
+
+def permissioned_formset_factory(form, formset=PermissionedBaseFormSet, **kwargs):
+    return formset_factory(form, formset=formset, **kwargs)
+
+
+def permissioned_modelformset_factory(
+    model, form=PermissionedModelForm, formset=PermissionedBaseModelFormSet, **kwargs
+):
+    return modelformset_factory(model, form=form, formset=formset, **kwargs)
@@ -0,0 +1,109 @@
+import threading
+
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .permissions import PermissionResolver
+
+
+class GroupPermissionMasks:
+    """
+    A process-wide cache mapping group IDs to the frozenset of permissions ("app_label.codename")
+    granted to each group. Entries are loaded on demand, in a single query for any number of
+    groups, and the whole cache is cleared whenever group permissions change.
+    """
+
+    def __init__(self):
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    def get_masks(self, group_ids):
+        """Return a list of the permission sets for the given group IDs"""
+        # Clearing the cache replaces the dict rather than emptying it, so this remains a
+        # consistent snapshot
+        masks = self._masks
+        missing_ids = [group_id for group_id in group_ids if group_id not in masks]
+        loaded_masks = self._load_masks(missing_ids) if missing_ids else {}
+        if loaded_masks:
+            with self._lock:
+                # Only store the results if the cache has not been cleared in the meantime, as
+                # they may predate the change that caused it to be cleared
+                if self._masks is masks:
+                    masks.update(loaded_masks)
+
+        return [
+            loaded_masks[group_id] if group_id in loaded_masks else masks[group_id]
+            for group_id in group_ids
+        ]
+
+    def _load_masks(self, group_ids):
+        loaded_masks = {group_id: set() for group_id in group_ids}
+        for group_id, app_label, codename in Permission.objects.filter(
+            group__in=group_ids
+        ).values_list("group__id", "content_type__app_label", "codename"):
+            loaded_masks[group_id].add("%s.%s" % (app_label, codename))
+        return {group_id: frozenset(mask) for group_id, mask in loaded_masks.items()}
+
+    def clear(self):
+        with self._lock:
+            self._masks = {}
+
+    def __len__(self):
+        return len(self._masks)
+
+
+group_permission_masks = GroupPermissionMasks()
+
+
+class GroupPermissionResolver(PermissionResolver):
+    """
+    A PermissionResolver for sites where users receive their permissions purely through group
+    membership. The permissions of each group are cached for the lifetime of the process (and
+    cleared when group permissions change), so that resolving a user's permissions needs only a
+    single query for the user's group memberships.
+
+    Permissions assigned to users directly, and those provided by authentication backends other
+    than ModelBackend, are not seen by this resolver. Object-level permission tests are passed
+    on to `User.has_perm`.
+    """
+
+    def get_granted_permissions(self, user, permissions, obj=None):
+        if obj is not None:
+            return super().get_granted_permissions(user, permissions, obj)
+
+        if not getattr(user, "is_active", False) or getattr(user, "pk", None) is None:
+            return set()
+        if getattr(user, "is_superuser", False):
+            return set(permissions)
+
+        group_ids = list(user.groups.values_list("pk", flat=True))
+        granted_permissions = frozenset().union(
+            *group_permission_masks.get_masks(group_ids)
+        )
+        return {perm for perm in permissions if perm in granted_permissions}
+
+
+def clear_group_permission_masks(using=None, **kwargs):
+    group_permission_masks.clear()
+    # Another thread may reload the masks before the change is committed, and so cache the old
+    # permissions; clear them again once it is
+    transaction.on_commit(group_permission_masks.clear, using=using)
+
+
+m2m_changed.connect(
+    clear_group_permission_masks,
+    sender=Group.permissions.through,
+    dispatch_uid="permissionedforms_group_permissions_changed",
+)
+for model in [Group, Permission]:
+    post_save.connect(
+        clear_group_permission_masks,
+        sender=model,
+        dispatch_uid="permissionedforms_%s_saved" % model._meta.model_name,
+    )
+    post_delete.connect(
+        clear_group_permission_masks,
+        sender=model,
+        dispatch_uid="permissionedforms_%s_deleted" % model._meta.model_name,
+    )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from permissionedforms.warmup import find_unknown_permissions, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Import and prepare all permissioned form classes, and check that the permissions "
+        "they refer to exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Exit with an error if any form refers to a nonexistent permission.",
+        )
+
+    def handle(self, *args, **options):
+        form_classes = warm_up()
+        unknown_permissions = find_unknown_permissions(form_classes)
+
+        for form_class, permissions in sorted(
+            unknown_permissions.items(),
+            key=lambda item: (item[0].__module__, item[0].__qualname__),
+        ):
+            self.stderr.write(
+                "%s.%s refers to unknown permission(s): %s"
+                % (
+                    form_class.__module__,
+                    form_class.__qualname__,
+                    ", ".join(permissions),
+                )
+            )
+
+        if unknown_permissions and options["strict"]:
+            raise CommandError(
+                "%d form class(es) refer to unknown permissions."
+                % len(unknown_permissions)
+            )
+
+        if options["verbosity"] >= 1:
+            self.stdout.write("Warmed up %d form class(es)." % len(form_classes))
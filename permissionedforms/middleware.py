@@ -0,0 +1,39 @@
+import asyncio
+
+from .permissions import permission_cache
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6, as used by Django < 4.2
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+
+class PermissionCacheMiddleware:
+    """
+    Middleware that memoizes the permission lookups made by permissioned forms for the lifetime
+    of each request, by wrapping the request in a `permission_cache()` block. Supports both
+    synchronous and asynchronous request handling.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with permission_cache():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with permission_cache():
+            return await self.get_response(request)
@@ -0,0 +1,313 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+__all__ = [
+    "PermissionExpression",
+    "Any",
+    "All",
+    "Not",
+    "PermissionResolver",
+    "AllPermissionsResolver",
+    "permission_cache",
+]
+
+
+class PermissionExpression:
+    """
+    Base class for boolean combinations of permissions, which can be used in place of a single
+    permission codename in `field_permissions`. Operands are permission codenames or further
+    expressions.
+
+    Expressions are compiled with `compile()` into a function that takes the set of permissions
+    the user has been granted, and returns whether the expression is satisfied. All permissions
+    referenced by the expression are available as `permissions`, so that they can be looked up
+    together with those of the other fields of the form.
+    """
+
+    def __init__(self, *operands):
+        for operand in operands:
+            if not isinstance(operand, (str, PermissionExpression)):
+                raise TypeError(
+                    "%s operands must be permission codenames or expressions, not %r"
+                    % (type(self).__name__, operand)
+                )
+        self.operands = operands
+        self.permissions = frozenset().union(
+            *(
+                operand.permissions
+                if isinstance(operand, PermissionExpression)
+                else {operand}
+                for operand in operands
+            )
+        )
+
+    def compile(self):
+        raise NotImplementedError
+
+    def _compile_operands(self):
+        return tuple(
+            operand.compile()
+            if isinstance(operand, PermissionExpression)
+            else _compile_permission_test(operand)
+            for operand in self.operands
+        )
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.operands == other.operands
+
+    def __hash__(self):
+        return hash((type(self), self.operands))
+
+    def __repr__(self):
+        return "%s(%s)" % (
+            type(self).__name__,
+            ", ".join(repr(operand) for operand in self.operands),
+        )
+
+
+def _compile_permission_test(perm):
+    return lambda granted_permissions: perm in granted_permissions
+
+
+class Any(PermissionExpression):
+    """Satisfied if any of its operands is satisfied"""
+
+    def compile(self):
+        tests = self._compile_operands()
+        return lambda granted_permissions: any(
+            test(granted_permissions) for test in tests
+        )
+
+
+class All(PermissionExpression):
+    """Satisfied if all of its operands are satisfied"""
+
+    def compile(self):
+        tests = self._compile_operands()
+        return lambda granted_permissions: all(
+            test(granted_permissions) for test in tests
+        )
+
+
+class Not(PermissionExpression):
+    """Satisfied if its single operand is not satisfied"""
+
+    def __init__(self, operand):
+        super().__init__(operand)
+
+    def compile(self):
+        (test,) = self._compile_operands()
+        return lambda granted_permissions: not test(granted_permissions)
+
+
+class PermissionResolver:
+    """
+    Determines which of a collection of permissions a user holds. A PermissionedForm asks its
+    resolver about all of the permissions named in `field_permissions` in a single call, so that
+    implementations are free to answer them with one bulk lookup.
+
+    Permissions may be tested against a specific object, as with `User.has_perm(perm, obj)`;
+    `get_granted_permissions_for_objects` performs this test for a list of objects at once.
+
+    This base implementation tests each permission in turn with `User.has_perm`, and so gives the
+    same results as Django's permission checks for any combination of authentication backends.
+    """
+
+    def get_granted_permissions(self, user, permissions, obj=None):
+        """
+        Return the set of permissions within `permissions` that `user` holds, either globally or
+        on the object `obj` if specified
+        """
+        if obj is None:
+            return {perm for perm in permissions if user.has_perm(perm)}
+        return {perm for perm in permissions if user.has_perm(perm, obj)}
+
+    async def aget_granted_permissions(self, user, permissions, obj=None):
+        """
+        Asynchronous version of get_granted_permissions. Uses `User.ahas_perm` where available
+        (Django 5.2 and above); otherwise, and for subclasses that override
+        get_granted_permissions without overriding this method, get_granted_permissions is run in
+        a thread via sync_to_async.
+        """
+        overridden = (
+            type(self).get_granted_permissions
+            is not PermissionResolver.get_granted_permissions
+        )
+        if overridden or not hasattr(user, "ahas_perm"):
+            obj_args = () if obj is None else (obj,)
+            return await sync_to_async(self.get_granted_permissions)(
+                user, permissions, *obj_args
+            )
+
+        if obj is None:
+            return {perm for perm in permissions if await user.ahas_perm(perm)}
+        return {perm for perm in permissions if await user.ahas_perm(perm, obj)}
+
+    def get_granted_permissions_for_objects(self, user, permissions, objs):
+        """
+        Return a list of the sets of permissions within `permissions` that `user` holds on each
+        object in `objs`, in the same order as `objs`. This implementation calls
+        get_granted_permissions once per object; subclasses can override it to fetch the
+        permissions for all objects in a single query.
+        """
+        return [self.get_granted_permissions(user, permissions, obj) for obj in objs]
+
+
+class AllPermissionsResolver(PermissionResolver):
+    """
+    A PermissionResolver that fetches the user's full set of permissions once, via
+    `User.get_all_permissions`, and answers every permission test from that set.
+
+    This avoids going through the authentication backend chain once per permission, but relies on
+    the configured backends implementing `get_all_permissions` consistently with `has_perm` - as
+    django.contrib.auth.backends.ModelBackend does. Users that do not provide
+    `get_all_permissions` fall back on testing each permission with `has_perm`.
+    """
+
+    def get_granted_permissions(self, user, permissions, obj=None):
+        if getattr(user, "is_active", False) and getattr(user, "is_superuser", False):
+            # Active superusers have all permissions, including arbitrary codenames that do not
+            # exist in the database, without any backend being consulted
+            return set(permissions)
+
+        get_all_permissions = getattr(user, "get_all_permissions", None)
+        if get_all_permissions is None:
+            return super().get_granted_permissions(user, permissions, obj)
+
+        all_permissions = (
+            get_all_permissions() if obj is None else get_all_permissions(obj)
+        )
+        return {perm for perm in permissions if perm in all_permissions}
+
+    async def aget_granted_permissions(self, user, permissions, obj=None):
+        """
+        Asynchronous version of get_granted_permissions, using `User.aget_all_permissions` where
+        available (Django 5.2 and above)
+        """
+        overridden = (
+            type(self).get_granted_permissions
+            is not AllPermissionsResolver.get_granted_permissions
+        )
+        if overridden or not hasattr(user, "aget_all_permissions"):
+            return await super().aget_granted_permissions(user, permissions, obj)
+
+        if getattr(user, "is_active", False) and getattr(user, "is_superuser", False):
+            return set(permissions)
+
+        all_permissions = await (
+            user.aget_all_permissions()
+            if obj is None
+            else user.aget_all_permissions(obj)
+        )
+        return {perm for perm in permissions if perm in all_permissions}
+
+
+default_permission_resolver = AllPermissionsResolver()
+
+
+# Holds a dict of memoized permission answers while within a permission_cache() block
+_permission_cache = ContextVar("permissionedforms_permission_cache", default=None)
+
+
+@contextmanager
+def permission_cache():
+    """
+    Context manager that memoizes the permission lookups made by permissioned forms for the
+    duration of the block, so that forms built for the same user - such as the several forms
+    making up a single page - share their answers rather than each looking them up again.
+
+    The memo is held in a context variable, so concurrent requests under ASGI each see their own.
+    Nested blocks share the memo of the outermost one. Changes to a user's permissions made within
+    the block will not be seen by later forms in the same block.
+    """
+    if _permission_cache.get() is not None:
+        yield
+        return
+
+    token = _permission_cache.set({})
+    try:
+        yield
+    finally:
+        _permission_cache.reset(token)
+
+
+def _get_cache_key(user, obj):
+    pk = getattr(user, "pk", None)
+    if pk is None and not getattr(user, "is_anonymous", False):
+        # An unsaved user has nothing to identify it by
+        return None
+    if obj is None:
+        return (type(user), pk)
+    if getattr(obj, "pk", None) is None:
+        return None
+    return (type(user), pk, type(obj), obj.pk)
+
+
+def _get_memoized_answers(resolver, user, obj):
+    """
+    Return the dict of memoized permission answers for this resolver, user and object, or None
+    if we are not within a permission_cache() block
+    """
+    cache = _permission_cache.get()
+    if cache is None:
+        return None
+    key = _get_cache_key(user, obj)
+    if key is None:
+        return None
+    return cache.setdefault((resolver, key), {})
+
+
+def resolve_permissions(resolver, user, permissions, obj=None):
+    """
+    Return the set of permissions within `permissions` that `user` holds (on `obj`, if given), as
+    determined by `resolver`. Within a permission_cache() block, answers are memoized, and only
+    permissions that have not previously been looked up for this user, object and resolver are
+    passed to the resolver.
+    """
+    granted_perms, _ = resolve_permissions_counted(resolver, user, permissions, obj)
+    return granted_perms
+
+
+def resolve_permissions_counted(resolver, user, permissions, obj=None):
+    """
+    As resolve_permissions, but return a tuple of the granted permissions and the number of
+    permissions that were passed to the resolver (zero if all were answered from the memo)
+    """
+    # Only pass obj when given, so that resolvers written without object-level permissions in
+    # mind continue to work
+    obj_args = () if obj is None else (obj,)
+    answers = _get_memoized_answers(resolver, user, obj)
+    if answers is None:
+        granted_perms = resolver.get_granted_permissions(user, permissions, *obj_args)
+        return granted_perms, len(permissions)
+
+    unknown_perms = {perm for perm in permissions if perm not in answers}
+    if unknown_perms:
+        granted_perms = resolver.get_granted_permissions(user, unknown_perms, *obj_args)
+        for perm in unknown_perms:
+            answers[perm] = perm in granted_perms
+
+    return {perm for perm in permissions if answers[perm]}, len(unknown_perms)
+
+
+async def aresolve_permissions(resolver, user, permissions, obj=None):
+    """
+    Asynchronous version of resolve_permissions, using the resolver's aget_granted_permissions
+    method
+    """
+    obj_args = () if obj is None else (obj,)
+    answers = _get_memoized_answers(resolver, user, obj)
+    if answers is None:
+        return await resolver.aget_granted_permissions(user, permissions, *obj_args)
+
+    unknown_perms = {perm for perm in permissions if perm not in answers}
+    if unknown_perms:
+        granted_perms = await resolver.aget_granted_permissions(
+            user, unknown_perms, *obj_args
+        )
+        for perm in unknown_perms:
+            answers[perm] = perm in granted_perms
+
+    return {perm for perm in permissions if answers[perm]}
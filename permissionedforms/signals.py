@@ -0,0 +1,20 @@
+from django.dispatch import Signal
+
+# Sent after a permissioned form instantiated with for_user has applied its permissions, with
+# sender set to the form class and the keyword arguments:
+#
+# form - the form instance
+# user - the user passed as for_user
+# permission_checks - the number of permissions passed to the permission resolver's
+#     get_granted_permissions method, in a single call (zero if they were passed in with
+#     granted_permissions, as formsets and acreate do, or were all answered within a
+#     permission_cache() block)
+# removed_fields - a list of the names of the fields removed from the form
+# disabled_fields - a list of the names of the fields disabled by disable_denied_fields
+# layout_cache_hit - whether the field layout was found in the form's field layout cache, or
+#     None if the cache was not consulted
+# duration - the time in seconds spent on permission handling, excluding the rest of the form's
+#     construction
+#
+# No statistics are gathered unless a receiver is connected.
+form_permissions_applied = Signal()
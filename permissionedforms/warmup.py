@@ -0,0 +1,61 @@
+from django.utils.module_loading import autodiscover_modules
+
+from .forms import form_class_registry
+
+
+def warm_up(autodiscover=True):
+    """
+    Prepare all permissioned form classes for use, so that this work is not left to the first
+    requests to use them. If autodiscover is true, the `forms` module of each installed app is
+    imported first, so that the form classes defined there are registered.
+
+    Each class's field layout cache is populated with the layouts for a user holding none, and
+    all, of the form's permissions. Returns a list of the registered form classes.
+    """
+    if autodiscover:
+        autodiscover_modules("forms")
+
+    form_classes = list(form_class_registry)
+    for form_class in form_classes:
+        permissions = form_class._meta.field_permission_index.permissions
+        if permissions:
+            form_class._get_permitted_field_names(frozenset())
+            form_class._get_permitted_field_names(permissions)
+    return form_classes
+
+
+def find_unknown_permissions(form_classes=None):
+    """
+    Check the permissions referenced by the given form classes (by default, all registered
+    classes) against the Permission table, with a single query. Returns a dict mapping each form
+    class that refers to nonexistent permissions to a sorted list of those permissions.
+
+    Note that codenames that do not exist in the database are not necessarily errors, as they
+    may be handled by a custom authentication backend, or be intended for superusers only.
+    """
+    from django.contrib.auth.models import Permission
+
+    if form_classes is None:
+        form_classes = list(form_class_registry)
+
+    permissions_by_class = {
+        form_class: form_class._meta.required_permissions for form_class in form_classes
+    }
+    all_permissions = frozenset().union(*permissions_by_class.values())
+    codenames = {perm.partition(".")[2] for perm in all_permissions if "." in perm}
+
+    existing_permissions = set()
+    if codenames:
+        existing_permissions = {
+            "%s.%s" % (app_label, codename)
+            for app_label, codename in Permission.objects.filter(
+                codename__in=codenames
+            ).values_list("content_type__app_label", "codename")
+        }
+
+    unknown_permissions = {}
+    for form_class, permissions in permissions_by_class.items():
+        unknown = permissions - existing_permissions
+        if unknown:
+            unknown_permissions[form_class] = sorted(unknown)
+    return unknown_permissions
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Run the benchmarks in tests/benchmarks.py against the test settings and models. Usage:
+
+    ./runbenchmarks.py [--quick] [--kind {form,modelform,clusterform}] [--min-time SECONDS]
+"""
+import argparse
+import os
+
+import django
+
+os.environ["DJANGO_SETTINGS_MODULE"] = "tests.settings"
+
+
+def runbenchmarks():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--quick", action="store_true", help="run a reduced set of scenarios"
+    )
+    parser.add_argument(
+        "--kind",
+        action="append",
+        choices=["form", "modelform", "clusterform"],
+        help="form kind to benchmark; may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="minimum duration of each timing run, in seconds (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    django.setup()
+    from tests import benchmarks
+
+    kinds = args.kind or ["form", "modelform", "clusterform"]
+    print(benchmarks.HEADER)
+    for scenario in benchmarks.get_scenarios(kinds, quick=args.quick):
+        for result in benchmarks.run_scenario(scenario, min_time=args.min_time):
+            print(benchmarks.format_result(result), flush=True)
+
+    field_counts = (
+        benchmarks.QUICK_FIELD_COUNTS if args.quick else benchmarks.FIELD_COUNTS
+    )
+    print()
+    print(benchmarks.CLASS_CREATION_HEADER)
+    for field_count in field_counts:
+        for result in benchmarks.run_class_creation_benchmark(
+            field_count, min_time=args.min_time
+        ):
+            print(benchmarks.format_class_creation_result(result), flush=True)
+
+    thread_counts = (
+        benchmarks.QUICK_THREAD_COUNTS if args.quick else benchmarks.THREAD_COUNTS
+    )
+    print()
+    print(benchmarks.CONCURRENCY_HEADER)
+    for result in benchmarks.run_concurrency_benchmark(thread_counts):
+        print(benchmarks.format_concurrency_result(result), flush=True)
+
+
+if __name__ == "__main__":
+    runbenchmarks()
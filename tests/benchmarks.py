@@ -0,0 +1,312 @@
+"""
+Benchmarks for constructing, validating and rendering permissioned forms. Run with
+./runbenchmarks.py; see that script for the available options.
+
+Each scenario builds a form class with a given number of fields, gated by a given number of
+distinct permissions, and a user who is denied a given proportion of them. Users are simple
+in-memory objects, so that the figures reflect the cost of the forms rather than of the
+database.
+"""
+import gc
+import math
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+from django import forms
+
+from permissionedforms import PermissionedForm, PermissionedModelForm
+
+from .forms import CountryForm, PermissionedClusterForm
+from .models import Country, Page
+
+FIELD_COUNTS = [10, 50, 100, 500]
+DENIED_RATIOS = [0, 0.5, 1]
+PERMISSION_COUNTS = [1, 10, 50]
+
+QUICK_FIELD_COUNTS = [10, 100]
+QUICK_DENIED_RATIOS = [0, 0.5]
+QUICK_PERMISSION_COUNTS = [1, 10]
+
+THREAD_COUNTS = [1, 2, 4, 8]
+QUICK_THREAD_COUNTS = [1, 4]
+
+Scenario = namedtuple(
+    "Scenario", ["kind", "field_count", "denied_ratio", "permission_count"]
+)
+Result = namedtuple(
+    "Result",
+    ["scenario", "denied_fields", "measure", "time_per_call", "allocated_per_call"],
+)
+
+
+class BenchmarkUser:
+    """A minimal stand-in for a user, holding a fixed set of permissions"""
+
+    is_active = True
+    is_superuser = False
+    is_anonymous = False
+
+    def __init__(self, pk, permissions):
+        self.pk = pk
+        self.permissions = frozenset(permissions)
+
+    def get_all_permissions(self, obj=None):
+        return self.permissions
+
+    def has_perm(self, perm, obj=None):
+        return perm in self.permissions
+
+
+def make_form_class(kind, field_count, permission_count):
+    """
+    Build a form class of the given kind ("form", "modelform" or "clusterform") with
+    field_count extra fields, each gated by one of permission_count permissions in turn
+    """
+    attrs = {
+        "field_%d" % i: forms.CharField(required=False) for i in range(field_count)
+    }
+    field_permissions = {
+        "field_%d" % i: "tests.benchmark_%d" % (i % permission_count)
+        for i in range(field_count)
+    }
+
+    if kind == "form":
+        base = PermissionedForm
+        meta_attrs = {}
+    elif kind == "modelform":
+        base = CountryForm
+        meta_attrs = {"model": CountryForm.Meta.model, "fields": ["name"]}
+    elif kind == "clusterform":
+        base = PermissionedClusterForm
+        meta_attrs = {"model": Page, "fields": ["title"], "formsets": ["tags"]}
+    else:
+        raise ValueError("Unknown form kind: %r" % kind)
+
+    meta_attrs["field_permissions"] = field_permissions
+    attrs["Meta"] = type("Meta", (), meta_attrs)
+    name = "Benchmark%s%d" % (kind.title(), field_count)
+    return type(base)(name, (base,), attrs)
+
+
+def make_user(pk, denied_ratio, permission_count):
+    """
+    Return a user who is denied denied_ratio of the permissions, rounded down to a whole number
+    of permissions where it does not divide exactly
+    """
+    granted_count = permission_count - math.floor(permission_count * denied_ratio)
+    return BenchmarkUser(pk, ["tests.benchmark_%d" % i for i in range(granted_count)])
+
+
+def make_data(form_class):
+    data = {name: "value" for name in form_class.base_fields}
+    if "tags" in getattr(form_class, "formsets", {}):
+        data.update({"tags-TOTAL_FORMS": "0", "tags-INITIAL_FORMS": "0"})
+    return data
+
+
+def measure(func, min_time=0.2):
+    """
+    Return the time taken per call to func, as the best of three runs of a number of calls
+    chosen to take at least min_time, and the peak number of bytes allocated during a call as
+    recorded by tracemalloc
+    """
+    func()  # warm up any caches
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 100000:
+            break
+        number *= 10
+
+    timings = [elapsed]
+    for _ in range(2):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings) / number, peak_size - start_size
+
+
+def run_scenario(scenario, min_time=0.2):
+    form_class = make_form_class(
+        scenario.kind, scenario.field_count, scenario.permission_count
+    )
+    user = make_user(1, scenario.denied_ratio, scenario.permission_count)
+    data = make_data(form_class)
+    denied_fields = len(form_class.base_fields) - len(
+        form_class.get_permitted_fields(user)
+    )
+
+    def instantiate():
+        form_class(for_user=user)
+
+    def validate():
+        form = form_class(data, for_user=user)
+        form.is_valid()
+
+    unbound_form = form_class(for_user=user)
+
+    def render():
+        unbound_form.as_p()
+
+    for measure_name, func in [
+        ("instantiate", instantiate),
+        ("is_valid", validate),
+        ("as_p", render),
+    ]:
+        time_per_call, allocated_per_call = measure(func, min_time=min_time)
+        yield Result(
+            scenario, denied_fields, measure_name, time_per_call, allocated_per_call
+        )
+
+
+def make_model_form_class(base, field_count, field_permissions=None):
+    """
+    Build a ModelForm subclass of base for the Country model, with field_count extra fields
+    """
+    attrs = {
+        "field_%d" % i: forms.CharField(required=False) for i in range(field_count)
+    }
+    meta_attrs = {"model": Country, "fields": "__all__"}
+    if field_permissions is not None:
+        meta_attrs["field_permissions"] = field_permissions
+    attrs["Meta"] = type("Meta", (), meta_attrs)
+    return type(base)("BenchmarkClassCreation%d" % field_count, (base,), attrs)
+
+
+def run_class_creation_benchmark(field_count, min_time=0.2):
+    """
+    Measure the cost of defining a PermissionedModelForm subclass with field_count extra fields
+    (all with field permissions), compared to the equivalent plain ModelForm subclass
+    """
+    field_permissions = {
+        "field_%d" % i: "tests.benchmark_%d" % i for i in range(field_count)
+    }
+    for base, perms in [
+        (forms.ModelForm, None),
+        (PermissionedModelForm, field_permissions),
+    ]:
+        time_per_call, allocated_per_call = measure(
+            lambda: make_model_form_class(base, field_count, perms), min_time=min_time
+        )
+        yield base.__name__, field_count, time_per_call, allocated_per_call
+
+
+def format_class_creation_result(result):
+    base_name, field_count, time_per_call, allocated_per_call = result
+    return "%-21s %6d %12.1f %12.1f" % (
+        base_name,
+        field_count,
+        time_per_call * 1e6,
+        allocated_per_call / 1024,
+    )
+
+
+CLASS_CREATION_HEADER = "%-21s %6s %12s %12s" % (
+    "class creation",
+    "fields",
+    "time (us)",
+    "alloc (KiB)",
+)
+
+
+def run_concurrency_benchmark(thread_counts, calls_per_thread=1000):
+    """
+    Measure the throughput of instantiating a permissioned form from several threads at once,
+    each cycling through users with different permissions, so that the threads share the form
+    class's field layout cache. Yields the number of threads, the calls per second across all
+    threads, and the throughput relative to that of the first thread count
+    """
+    form_class = make_form_class("form", 50, 10)
+    users = [
+        make_user(pk, denied_ratio, 10) for pk, denied_ratio in enumerate(DENIED_RATIOS)
+    ]
+
+    def instantiate_many():
+        for i in range(calls_per_thread):
+            form_class(for_user=users[i % len(users)])
+
+    instantiate_many()  # warm up the caches
+    base_throughput = None
+    for thread_count in thread_counts:
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            start = time.perf_counter()
+            futures = [executor.submit(instantiate_many) for _ in range(thread_count)]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+
+        throughput = thread_count * calls_per_thread / elapsed
+        if base_throughput is None:
+            base_throughput = throughput
+        yield thread_count, throughput, throughput / base_throughput
+
+
+def format_concurrency_result(result):
+    thread_count, throughput, scaling = result
+    return "%-21s %6d %12.0f %12.2f" % (
+        "instantiate",
+        thread_count,
+        throughput,
+        scaling,
+    )
+
+
+CONCURRENCY_HEADER = "%-21s %6s %12s %12s" % (
+    "concurrency",
+    "threads",
+    "calls/s",
+    "scaling",
+)
+
+
+def get_scenarios(kinds, quick=False):
+    if quick:
+        sizes = (QUICK_FIELD_COUNTS, QUICK_DENIED_RATIOS, QUICK_PERMISSION_COUNTS)
+    else:
+        sizes = (FIELD_COUNTS, DENIED_RATIOS, PERMISSION_COUNTS)
+    for kind, field_count, denied_ratio, permission_count in product(kinds, *sizes):
+        if not float(permission_count * denied_ratio).is_integer():
+            # The ratio cannot be represented with this number of permissions
+            continue
+        yield Scenario(kind, field_count, denied_ratio, permission_count)
+
+
+def format_result(result):
+    scenario = result.scenario
+    return "%-11s %6d %7d %5d  %-11s %12.1f %12.1f" % (
+        scenario.kind,
+        scenario.field_count,
+        result.denied_fields,
+        scenario.permission_count,
+        result.measure,
+        result.time_per_call * 1e6,
+        result.allocated_per_call / 1024,
+    )
+
+
+HEADER = "%-11s %6s %7s %5s  %-11s %12s %12s" % (
+    "form",
+    "fields",
+    "denied",
+    "perms",
+    "measure",
+    "time (us)",
+    "alloc (KiB)",
+)
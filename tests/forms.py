@@ -2,6 +2,7 @@ from django import forms
 from modelcluster.forms import ClusterForm, ClusterFormMetaclass, ClusterFormOptions
 
 from permissionedforms import (
+    FormsetPermissionsOptionsMixin,
     PermissionedForm,
     PermissionedFormMetaclass,
     PermissionedFormOptionsMixin,
@@ -19,6 +20,20 @@ class PersonForm(PermissionedForm):
         field_permissions = {"last_name": "tests.change_last_name"}
 
 
+class ContactForm(PermissionedForm):
+    name = forms.CharField()
+    email = forms.EmailField()
+    phone = forms.CharField()
+    notes = forms.CharField()
+
+    class Meta:
+        field_permissions = {
+            "email": "tests.view_contact_details",
+            "phone": "tests.view_contact_details",
+            "notes": "tests.change_contact_notes",
+        }
+
+
 class CountryForm(PermissionedModelForm):
     class Meta:
         model = Country
@@ -26,7 +41,9 @@ class CountryForm(PermissionedModelForm):
         field_permissions = {"description": "tests.change_country_description"}
 
 
-class PermissionedClusterFormOptions(PermissionedFormOptionsMixin, ClusterFormOptions):
+class PermissionedClusterFormOptions(
+    PermissionedFormOptionsMixin, FormsetPermissionsOptionsMixin, ClusterFormOptions
+):
     pass
 
 
@@ -46,3 +63,12 @@ class PageForm(PermissionedClusterForm):
         fields = ["title", "body"]
         formsets = ["tags"]
         field_permissions = {"title": "tests.change_page_title"}
+
+
+class TaggedPageForm(PermissionedClusterForm):
+    class Meta:
+        model = Page
+        fields = ["title", "body"]
+        formsets = ["tags"]
+        field_permissions = {"title": "tests.change_page_title"}
+        formset_permissions = {"tags": "tests.change_page_tags"}
@@ -18,7 +18,10 @@ class Page(ClusterableModel):
     body = models.TextField(blank=True)
 
     class Meta:
-        permissions = [("change_page_title", "Can change page titles")]
+        permissions = [
+            ("change_page_title", "Can change page titles"),
+            ("change_page_tags", "Can change page tags"),
+        ]
 
 
 class PageTag(models.Model):
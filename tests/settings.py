@@ -15,6 +15,7 @@ SECRET_KEY = "not needed"
 INSTALLED_APPS = [
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "permissionedforms",
     "tests",
 ]
 
@@ -1,8 +1,72 @@
-from django.contrib.auth.models import Permission, User
-from django.test import TestCase
+import gc
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock, skipIf
 
-from .forms import CountryForm, PageForm, PersonForm
-from .models import Country, Page
+import django
+from asgiref.sync import async_to_sync
+from django import forms
+from django.contrib.admin import AdminSite, ModelAdmin
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from permissionedforms import (
+    All,
+    Any,
+    Not,
+    PermissionedForm,
+    PermissionedModelForm,
+    PermissionResolver,
+    permission_cache,
+    permissioned_formset_factory,
+    permissioned_modelform_factory,
+    permissioned_modelformset_factory,
+)
+from permissionedforms.admin import PermissionedModelAdminMixin, current_admin_user
+from permissionedforms.cache import (
+    FieldLayoutCache,
+    LRUCache,
+    SharedFieldLayoutCache,
+    bump_shared_layout_cache_version,
+    get_schema_hash,
+)
+from permissionedforms.forms import (
+    OptionCollectingMetaclass,
+    PermissionedFormOptions,
+    PermissionedModelFormMetaclass,
+    PermissionedModelFormOptions,
+    form_class_registry,
+    modelform_class_cache,
+)
+from permissionedforms.groups import GroupPermissionResolver, group_permission_masks
+from permissionedforms.middleware import PermissionCacheMiddleware
+from permissionedforms.signals import form_permissions_applied
+from permissionedforms.warmup import find_unknown_permissions, warm_up
+
+from .benchmarks import (
+    BenchmarkUser,
+    Scenario,
+    get_scenarios,
+    make_user,
+    run_concurrency_benchmark,
+    run_scenario,
+)
+from .forms import (
+    ContactForm,
+    CountryForm,
+    PageForm,
+    PermissionedClusterForm,
+    PersonForm,
+    TaggedPageForm,
+)
+from .models import Country, Page, PageTag
 
 
 class PermissionedFormTest(TestCase):
@@ -109,6 +173,905 @@ class PermissionedFormTest(TestCase):
             count=0,
         )
 
+    def test_denied_fields_are_not_copied(self):
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        field_deepcopy = forms.Field.__deepcopy__
+        with mock.patch.object(
+            forms.Field, "__deepcopy__", autospec=True, side_effect=field_deepcopy
+        ) as deepcopy:
+            form = PersonForm(for_user=bob)
+
+        copied_fields = [call[0][0] for call in deepcopy.call_args_list]
+        self.assertIn(PersonForm.base_fields["first_name"], copied_fields)
+        self.assertNotIn(PersonForm.base_fields["last_name"], copied_fields)
+        self.assertEqual(list(form.fields), ["first_name"])
+        # the class-wide field definitions are unaffected
+        self.assertEqual(list(PersonForm.base_fields), ["first_name", "last_name"])
+
+
+class GetPermittedFieldsTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+
+    def test_get_permitted_fields(self):
+        self.assertEqual(ContactForm.get_permitted_fields(self.bob), ["name"])
+        with mock.patch.object(
+            User, "get_all_permissions", return_value={"tests.change_contact_notes"}
+        ):
+            fields = ContactForm.get_permitted_fields(self.bob)
+        self.assertEqual(fields, ["name", "notes"])
+
+    def test_get_permitted_fields_without_user(self):
+        self.assertEqual(
+            ContactForm.get_permitted_fields(None),
+            ["name", "email", "phone", "notes"],
+        )
+
+    def test_get_permitted_fields_for_model_form(self):
+        Country.objects.create(name="Ukraine", description="Blue and yellow")
+        with mock.patch.object(ContactForm, "__init__") as init:
+            fields = CountryForm.get_permitted_fields(self.bob)
+        init.assert_not_called()
+        self.assertEqual(fields, ["name"])
+        country = Country.objects.only(*fields).get()
+        self.assertEqual(country.get_deferred_fields(), {"description"})
+
+
+class ValidateManyTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+
+    def test_validate_many(self):
+        rows = [
+            {"name": "Ziggy", "email": "not an email address"},
+            {"name": ""},
+            {"name": "Aladdin", "notes": "Sane"},
+        ]
+        with mock.patch.object(
+            User,
+            "get_all_permissions",
+            return_value={"tests.change_contact_notes"},
+        ) as get_all_permissions:
+            results = list(ContactForm.validate_many(rows, for_user=self.bob))
+
+        get_all_permissions.assert_called_once()
+        self.assertEqual([result.is_valid for result in results], [False, False, True])
+        self.assertEqual(list(results[0].errors), ["notes"])
+        self.assertIsNone(results[0].cleaned_data)
+        self.assertEqual(list(results[1].errors), ["name", "notes"])
+        self.assertEqual(results[2].cleaned_data, {"name": "Aladdin", "notes": "Sane"})
+        self.assertIsNone(results[2].errors)
+
+    def test_fields_copied_once(self):
+        rows = [{"name": "Ziggy"}, {"name": ""}, {"name": "Aladdin"}]
+        with mock.patch.object(
+            forms.Field,
+            "__deepcopy__",
+            autospec=True,
+            side_effect=forms.Field.__deepcopy__,
+        ) as deepcopy:
+            results = list(ContactForm.validate_many(rows, for_user=self.bob))
+
+        # only the permitted field is copied, and only for the first row
+        self.assertEqual(deepcopy.call_count, 1)
+        self.assertEqual([result.is_valid for result in results], [True, False, True])
+        self.assertEqual(results[0].cleaned_data, {"name": "Ziggy"})
+        self.assertEqual(list(results[1].errors), ["name"])
+        self.assertEqual(results[2].cleaned_data, {"name": "Aladdin"})
+
+    def test_rows_consumed_lazily(self):
+        consumed = []
+
+        def generate_rows():
+            for name in ["Ziggy", "Aladdin"]:
+                consumed.append(name)
+                yield {"name": name}
+
+        results = CountryForm.validate_many(generate_rows(), for_user=self.bob)
+        self.assertEqual(consumed, [])
+        result = next(results)
+        self.assertEqual(consumed, ["Ziggy"])
+        self.assertTrue(result.is_valid)
+        country = result.form.save()
+        self.assertEqual(country.name, "Ziggy")
+        self.assertEqual(next(results).form.save().name, "Aladdin")
+        self.assertEqual(Country.objects.count(), 2)
+
+
+class PublicAPITest(TestCase):
+    def test_star_import(self):
+        namespace = {}
+        exec("from permissionedforms import *", namespace)
+        self.assertIn("PermissionedForm", namespace)
+        self.assertIn("permissioned_modelformset_factory", namespace)
+        self.assertIn("Any", namespace)
+        for name in ["time", "ContextVar", "sync_to_async", "ValidationError"]:
+            self.assertNotIn(name, namespace)
+
+
+class PermissionResolverTest(TestCase):
+    def test_default_resolver_fetches_permissions_once(self):
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        with mock.patch.object(
+            User, "get_all_permissions", return_value={"tests.view_contact_details"}
+        ) as get_all_permissions, mock.patch.object(User, "has_perm") as has_perm:
+            form = ContactForm(for_user=bob)
+
+        get_all_permissions.assert_called_once_with()
+        has_perm.assert_not_called()
+        self.assertEqual(list(form.fields), ["name", "email", "phone"])
+
+    def test_default_resolver_grants_superuser_arbitrary_permissions(self):
+        superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        form = ContactForm(for_user=superuser)
+        self.assertEqual(list(form.fields), ["name", "email", "phone", "notes"])
+
+    def test_default_resolver_denies_inactive_superuser(self):
+        superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password", is_active=False
+        )
+        form = ContactForm(for_user=superuser)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_custom_resolver(self):
+        class NotesOnlyResolver(PermissionResolver):
+            def get_granted_permissions(self, user, permissions, obj=None):
+                return {perm for perm in permissions if perm.endswith("_notes")}
+
+        resolver = NotesOnlyResolver()
+
+        class NotesForm(ContactForm):
+            class Meta:
+                field_permissions = ContactForm.Meta.field_permissions
+                permission_resolver = resolver
+
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        with mock.patch.object(
+            resolver, "get_granted_permissions", wraps=resolver.get_granted_permissions
+        ) as get_granted_permissions:
+            form = NotesForm(for_user=bob)
+
+        get_granted_permissions.assert_called_once_with(
+            bob, {"tests.view_contact_details", "tests.change_contact_notes"}
+        )
+        self.assertEqual(list(form.fields), ["name", "notes"])
+
+    def test_has_perm_resolver(self):
+        class HasPermContactForm(ContactForm):
+            class Meta:
+                field_permissions = ContactForm.Meta.field_permissions
+                permission_resolver = PermissionResolver()
+
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        with mock.patch.object(
+            User,
+            "has_perm",
+            autospec=True,
+            side_effect=lambda user, perm: perm == "tests.change_contact_notes",
+        ) as has_perm:
+            form = HasPermContactForm(for_user=bob)
+
+        self.assertEqual(has_perm.call_count, 2)
+        self.assertEqual(list(form.fields), ["name", "notes"])
+
+
+class FieldPermissionIndexTest(TestCase):
+    def test_index(self):
+        index = ContactForm._meta.field_permission_index
+        self.assertEqual(
+            index.permissions,
+            {"tests.view_contact_details", "tests.change_contact_notes"},
+        )
+        self.assertEqual(
+            index.fields_by_permission,
+            {
+                "tests.view_contact_details": {"email", "phone"},
+                "tests.change_contact_notes": {"notes"},
+            },
+        )
+        self.assertEqual(
+            index.get_denied_names({"tests.change_contact_notes"}),
+            {"email", "phone"},
+        )
+
+    def test_form_without_field_permissions(self):
+        class PlainForm(PermissionedForm):
+            name = forms.CharField()
+
+        self.assertEqual(PlainForm._meta.field_permission_index.permissions, set())
+
+    def test_unknown_field(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "field_permissions for BadPersonForm refers to unknown field(s): surname",
+        ):
+
+            class BadPersonForm(PermissionedForm):
+                first_name = forms.CharField()
+
+                class Meta:
+                    field_permissions = {"surname": "tests.change_last_name"}
+
+    def test_unknown_model_form_field(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "field_permissions for BadCountryForm refers to unknown field(s): description",
+        ):
+
+            class BadCountryForm(PermissionedModelForm):
+                class Meta:
+                    model = Country
+                    fields = ["name"]
+                    field_permissions = {
+                        "description": "tests.change_country_description"
+                    }
+
+    def test_inherited_field_permissions_for_removed_field(self):
+        class FirstNameForm(PersonForm):
+            last_name = None
+
+        self.assertEqual(
+            FirstNameForm._meta.field_permission_index.permissions, frozenset()
+        )
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        form = FirstNameForm(for_user=bob)
+        self.assertEqual(list(form.fields), ["first_name"])
+
+
+class FieldPermissionInheritanceTest(TestCase):
+    def test_subclass_with_own_meta_inherits_field_permissions(self):
+        class ExtendedContactForm(ContactForm):
+            address = forms.CharField()
+
+            class Meta:
+                field_permissions = {"address": "tests.view_contact_details"}
+
+        self.assertEqual(
+            dict(ExtendedContactForm._meta.field_permissions),
+            {
+                "email": "tests.view_contact_details",
+                "phone": "tests.view_contact_details",
+                "notes": "tests.change_contact_notes",
+                "address": "tests.view_contact_details",
+            },
+        )
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        form = ExtendedContactForm(for_user=bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_override_and_remove_entries(self):
+        class OpenContactForm(ContactForm):
+            class Meta:
+                field_permissions = {
+                    "email": None,
+                    "notes": "tests.view_contact_details",
+                }
+
+        self.assertEqual(
+            dict(OpenContactForm._meta.field_permissions),
+            {
+                "phone": "tests.view_contact_details",
+                "notes": "tests.view_contact_details",
+            },
+        )
+        # the parent class is unaffected
+        self.assertEqual(
+            ContactForm._meta.field_permissions["notes"], "tests.change_contact_notes"
+        )
+
+    def test_multiple_inheritance(self):
+        class AddressForm(PermissionedForm):
+            address = forms.CharField()
+            notes = forms.CharField()
+
+            class Meta:
+                field_permissions = {
+                    "address": "tests.view_contact_details",
+                    "notes": "tests.view_contact_details",
+                }
+
+        class ContactAddressForm(ContactForm, AddressForm):
+            pass
+
+        self.assertEqual(
+            dict(ContactAddressForm._meta.field_permissions),
+            {
+                "email": "tests.view_contact_details",
+                "phone": "tests.view_contact_details",
+                "notes": "tests.change_contact_notes",
+                "address": "tests.view_contact_details",
+            },
+        )
+
+    def test_diamond_inheritance(self):
+        class BaseForm(PermissionedForm):
+            x = forms.CharField()
+            y = forms.CharField()
+
+            class Meta:
+                field_permissions = {"x": "tests.base_x", "y": "tests.base_y"}
+
+        class AForm(BaseForm):
+            pass
+
+        class BForm(BaseForm):
+            class Meta:
+                field_permissions = {"x": "tests.b_x", "y": None}
+
+        class CForm(AForm, BForm):
+            pass
+
+        # the MRO is CForm, AForm, BForm, BaseForm, so BForm's declarations take precedence
+        # over BaseForm's
+        self.assertEqual(dict(CForm._meta.field_permissions), {"x": "tests.b_x"})
+
+        class DForm(BForm, AForm):
+            class Meta:
+                field_permissions = {"y": "tests.d_y"}
+
+        self.assertEqual(
+            dict(DForm._meta.field_permissions), {"x": "tests.b_x", "y": "tests.d_y"}
+        )
+
+    def test_field_permissions_are_immutable(self):
+        with self.assertRaises(TypeError):
+            ContactForm._meta.field_permissions["name"] = "tests.change_contact_name"
+
+    def test_model_form_subclass(self):
+        class CountryNameForm(CountryForm):
+            class Meta(CountryForm.Meta):
+                field_permissions = {"name": "tests.change_country_description"}
+
+        self.assertEqual(
+            dict(CountryNameForm._meta.field_permissions),
+            {
+                "name": "tests.change_country_description",
+                "description": "tests.change_country_description",
+            },
+        )
+
+
+class PermissionExpressionTest(TestCase):
+    def setUp(self):
+        class ArticleForm(PermissionedForm):
+            title = forms.CharField()
+            body = forms.CharField()
+            notes = forms.CharField()
+
+            class Meta:
+                field_permissions = {
+                    "body": All(
+                        Any("tests.edit_article", "tests.own_article"),
+                        Not("tests.article_locked"),
+                    ),
+                    "notes": Any("tests.edit_article", "tests.view_notes"),
+                }
+
+        self.form_class = ArticleForm
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+
+    def get_fields(self, granted_permissions):
+        with mock.patch.object(
+            User, "get_all_permissions", return_value=granted_permissions
+        ) as get_all_permissions:
+            form = self.form_class(for_user=self.bob)
+        get_all_permissions.assert_called_once_with()
+        return list(form.fields)
+
+    def test_expressions(self):
+        self.assertEqual(self.get_fields(set()), ["title"])
+        self.assertEqual(self.get_fields({"tests.own_article"}), ["title", "body"])
+        self.assertEqual(
+            self.get_fields({"tests.edit_article"}), ["title", "body", "notes"]
+        )
+        self.assertEqual(
+            self.get_fields({"tests.edit_article", "tests.article_locked"}),
+            ["title", "notes"],
+        )
+
+    def test_permissions_are_collected(self):
+        self.assertEqual(
+            self.form_class._meta.required_permissions,
+            {
+                "tests.edit_article",
+                "tests.own_article",
+                "tests.article_locked",
+                "tests.view_notes",
+            },
+        )
+
+    def test_short_circuit(self):
+        granted_permissions = mock.MagicMock()
+        granted_permissions.__contains__.side_effect = lambda perm: perm == "a"
+        test = Any("a", "b").compile()
+        self.assertTrue(test(granted_permissions))
+        granted_permissions.__contains__.assert_called_once_with("a")
+
+    def test_equality(self):
+        self.assertEqual(Any("a", Not("b")), Any("a", Not("b")))
+        self.assertNotEqual(Any("a", "b"), All("a", "b"))
+        self.assertEqual(repr(Any("a", Not("b"))), "Any('a', Not('b'))")
+
+    def test_invalid_operand(self):
+        with self.assertRaises(TypeError):
+            Any("a", None)
+
+
+class FieldLayoutCacheTest(TestCase):
+    def setUp(self):
+        self.cache = ContactForm._meta.field_layout_cache
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+
+    def test_layouts_are_cached_per_permission_signature(self):
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        bill = User.objects.create_user("bill", "bill@example.com", "password")
+        superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+
+        self.assertEqual(list(ContactForm(for_user=bob).fields), ["name"])
+        self.assertEqual(list(ContactForm(for_user=bill).fields), ["name"])
+        self.assertEqual(
+            list(ContactForm(for_user=superuser).fields),
+            ["name", "email", "phone", "notes"],
+        )
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(
+            self.cache.get(frozenset()),
+            ("name",),
+        )
+
+    def test_clear(self):
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        ContactForm(for_user=bob)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.cache_info(), (0, 0, 128, 0))
+
+    def test_cache_is_per_class(self):
+        self.assertIsNot(PersonForm._meta.field_layout_cache, self.cache)
+
+    def test_bounded_size(self):
+        cache = FieldLayoutCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        # "b" is the least recently used entry
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.cache_info(), (3, 1, 2, 2))
+
+    def test_cache_size_option(self):
+        class UncachedContactForm(ContactForm):
+            class Meta:
+                field_permissions = ContactForm.Meta.field_permissions
+                field_layout_cache_size = 0
+
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.assertEqual(list(UncachedContactForm(for_user=bob).fields), ["name"])
+        self.assertEqual(len(UncachedContactForm._meta.field_layout_cache), 0)
+
+
+class SharedFieldLayoutCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        class SharedContactForm(ContactForm):
+            class Meta:
+                field_layout_cache_alias = "default"
+
+        self.form_class = SharedContactForm
+        self.layout_cache = SharedContactForm._meta.field_layout_cache
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+
+    def test_shared_cache(self):
+        self.assertIsInstance(self.layout_cache, SharedFieldLayoutCache)
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+        self.assertEqual(self.layout_cache.shared_misses, 1)
+
+        # simulate another process, with an empty local cache
+        self.layout_cache.clear()
+        with mock.patch.object(
+            self.form_class._meta.field_permission_index,
+            "get_denied_names",
+        ) as get_denied_names:
+            form = self.form_class(for_user=self.bob)
+        get_denied_names.assert_not_called()
+        self.assertEqual(list(form.fields), ["name"])
+        self.assertEqual(self.layout_cache.shared_hits, 1)
+
+        # the layout is now held locally, so the shared cache is not consulted again
+        self.form_class(for_user=self.bob)
+        self.assertEqual(self.layout_cache.shared_hits, 1)
+        self.assertEqual(self.layout_cache.hits, 1)
+
+    def test_shared_hit_reported_by_signal(self):
+        calls = []
+
+        def receiver(**kwargs):
+            calls.append(kwargs["layout_cache_hit"])
+
+        form_permissions_applied.connect(receiver)
+        try:
+            self.form_class(for_user=self.bob)
+            self.layout_cache.clear()
+            self.form_class(for_user=self.bob)
+        finally:
+            form_permissions_applied.disconnect(receiver)
+
+        self.assertEqual(calls, [False, True])
+
+    def test_bump_version(self):
+        self.form_class(for_user=self.bob)
+        self.layout_cache.clear()
+        bump_shared_layout_cache_version()
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+        self.assertEqual(self.layout_cache.shared_hits, 0)
+        self.assertEqual(self.layout_cache.shared_misses, 1)
+
+    def test_schema_hash(self):
+        self.assertIn(
+            get_schema_hash(
+                ContactForm.base_fields, ContactForm._meta.field_permissions
+            ),
+            self.layout_cache.namespace,
+        )
+        self.assertNotEqual(
+            get_schema_hash(["name", "email"], {"email": "tests.view_contact_details"}),
+            get_schema_hash(["email", "name"], {"email": "tests.view_contact_details"}),
+        )
+        self.assertNotEqual(
+            get_schema_hash(["name", "email"], {"email": "tests.view_contact_details"}),
+            get_schema_hash(["name", "email"], {"email": "tests.change_contact_notes"}),
+        )
+
+
+@skipIf(django.VERSION < (4, 0), "Form.render was added in Django 4.0")
+class RenderCacheTest(TestCase):
+    def setUp(self):
+        class CachedContactForm(ContactForm):
+            class Meta:
+                render_cache_size = 10
+
+        self.form_class = CachedContactForm
+        self.render_cache = CachedContactForm._meta.render_cache
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+
+    def test_unbound_forms_cached(self):
+        html = self.form_class(for_user=self.bob).as_p()
+        self.assertEqual(self.render_cache.misses, 1)
+        with mock.patch.object(forms.Form, "render") as render:
+            cached_html = self.form_class(for_user=self.bob).as_p()
+        render.assert_not_called()
+        self.assertEqual(cached_html, html)
+        self.assertEqual(self.render_cache.hits, 1)
+
+    def test_key_includes_fields_and_initial(self):
+        bob_html = self.form_class(for_user=self.bob).as_p()
+        superuser_html = self.form_class(for_user=self.superuser).as_p()
+        self.assertNotIn('name="notes"', bob_html)
+        self.assertIn('name="notes"', superuser_html)
+
+        initial_html = self.form_class(
+            initial={"name": "Ziggy"}, for_user=self.bob
+        ).as_p()
+        self.assertIn('value="Ziggy"', initial_html)
+        prefixed_html = self.form_class(prefix="contact", for_user=self.bob).as_p()
+        self.assertIn('name="contact-name"', prefixed_html)
+        self.assertEqual(len(self.render_cache), 4)
+
+    def test_bound_forms_not_cached(self):
+        self.form_class({"name": "Ziggy"}, for_user=self.bob).as_p()
+        self.assertEqual(len(self.render_cache), 0)
+
+    def test_callable_initial_not_cached(self):
+        form = self.form_class(for_user=self.bob)
+        form.fields["name"].initial = lambda: "Ziggy"
+        form.as_p()
+        self.assertEqual(len(self.render_cache), 0)
+
+    def test_key_includes_field_initial_and_choices(self):
+        class UserContactForm(self.form_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.fields["name"].initial = self.user_name
+
+        UserContactForm.user_name = "alice"
+        self.assertIn('value="alice"', UserContactForm(for_user=self.bob).as_p())
+        UserContactForm.user_name = "mallory"
+        mallory_html = UserContactForm(for_user=self.bob).as_p()
+        self.assertIn('value="mallory"', mallory_html)
+        self.assertNotIn("alice", mallory_html)
+
+        class ChoiceContactForm(self.form_class):
+            colour = forms.ChoiceField(choices=[("red", "Red")])
+
+        form = ChoiceContactForm(for_user=self.bob)
+        form.as_p()
+        form = ChoiceContactForm(for_user=self.bob)
+        form.fields["colour"].choices = [("blue", "Blue")]
+        self.assertIn('value="blue"', form.as_p())
+
+    def test_database_and_callable_choices_not_cached(self):
+        class CountryChoiceForm(self.form_class):
+            country = forms.ModelChoiceField(Country.objects.all())
+
+        html = CountryChoiceForm(for_user=self.bob).as_p()
+        self.assertNotIn("Country object", html)
+        country = Country.objects.create(name="Ukraine")
+        html = CountryChoiceForm(for_user=self.bob).as_p()
+        self.assertIn('value="%d"' % country.pk, html)
+
+        class CallableChoiceForm(self.form_class):
+            colour = forms.ChoiceField(choices=lambda: [("red", "Red")])
+
+        CallableChoiceForm(for_user=self.bob).as_p()
+        self.assertEqual(len(CountryChoiceForm._meta.render_cache), 0)
+        self.assertEqual(len(CallableChoiceForm._meta.render_cache), 0)
+
+    def test_disabled_by_default(self):
+        ContactForm(for_user=self.bob).as_p()
+        self.assertEqual(len(ContactForm._meta.render_cache), 0)
+
+
+class PermissionCacheTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.bob.user_permissions.add(
+            Permission.objects.get(codename="change_country_description")
+        )
+
+    def get_all_permissions_mock(self):
+        return mock.patch.object(
+            User,
+            "get_all_permissions",
+            autospec=True,
+            return_value={"tests.change_country_description"},
+        )
+
+    def test_without_permission_cache(self):
+        country = Country.objects.create(name="Ukraine")
+        with self.get_all_permissions_mock() as get_all_permissions:
+            CountryForm(instance=country, for_user=self.bob)
+            CountryForm(instance=country, for_user=self.bob)
+        self.assertEqual(get_all_permissions.call_count, 2)
+
+    def test_permission_cache(self):
+        country = Country.objects.create(name="Ukraine")
+        with self.get_all_permissions_mock() as get_all_permissions:
+            with permission_cache():
+                form1 = CountryForm(instance=country, for_user=self.bob)
+                # a different user object for the same user shares the memoized answers
+                bob = User.objects.get(username="bob")
+                form2 = CountryForm(instance=country, for_user=bob)
+                # a form with different permissions only looks up the new ones
+                form3 = ContactForm(for_user=self.bob)
+                form4 = ContactForm(for_user=self.bob)
+
+        self.assertEqual(get_all_permissions.call_count, 2)
+        self.assertIn("description", form1.fields)
+        self.assertIn("description", form2.fields)
+        self.assertEqual(list(form3.fields), ["name"])
+        self.assertEqual(list(form4.fields), ["name"])
+
+    def test_permission_cache_is_per_user(self):
+        alice = User.objects.create_user("alice", "alice@example.com", "password")
+        with permission_cache():
+            self.assertIn("description", CountryForm(for_user=self.bob).fields)
+            self.assertNotIn("description", CountryForm(for_user=alice).fields)
+
+    def test_nested_permission_cache(self):
+        with self.get_all_permissions_mock() as get_all_permissions:
+            with permission_cache():
+                CountryForm(for_user=self.bob)
+                with permission_cache():
+                    CountryForm(for_user=self.bob)
+                CountryForm(for_user=self.bob)
+        self.assertEqual(get_all_permissions.call_count, 1)
+
+    def test_middleware(self):
+        def view(request):
+            CountryForm(for_user=self.bob)
+            CountryForm(for_user=self.bob)
+            return HttpResponse()
+
+        middleware = PermissionCacheMiddleware(view)
+        request = RequestFactory().get("/")
+        with self.get_all_permissions_mock() as get_all_permissions:
+            middleware(request)
+            middleware(request)
+        # one lookup per request
+        self.assertEqual(get_all_permissions.call_count, 2)
+
+    def test_async_middleware(self):
+        async def view(request):
+            CountryForm(for_user=self.bob)
+            CountryForm(for_user=self.bob)
+            return HttpResponse()
+
+        middleware = PermissionCacheMiddleware(view)
+        request = RequestFactory().get("/")
+        with self.get_all_permissions_mock() as get_all_permissions:
+            async_to_sync(middleware)(request)
+        self.assertEqual(get_all_permissions.call_count, 1)
+
+
+class AsyncFormCreationTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.bob.user_permissions.add(
+            Permission.objects.get(codename="change_country_description")
+        )
+        self.bob = User.objects.get(pk=self.bob.pk)
+
+    async def test_acreate(self):
+        form = await CountryForm.acreate({"name": "France"}, for_user=self.bob)
+        self.assertIn("description", form.fields)
+        form = await PersonForm.acreate({"first_name": "David"}, for_user=self.bob)
+        self.assertEqual(list(form.fields), ["first_name"])
+        self.assertTrue(form.is_bound)
+
+    async def test_acreate_without_user(self):
+        form = await PersonForm.acreate()
+        self.assertEqual(list(form.fields), ["first_name", "last_name"])
+
+    def mock_async_method(self, name, return_value=None, side_effect=None):
+        """
+        Patch an async method onto User (creating it if this Django version lacks it), returning
+        a list that records the arguments of each call
+        """
+        calls = []
+
+        async def method(user, *args):
+            calls.append(args)
+            return side_effect(*args) if side_effect else return_value
+
+        patcher = mock.patch.object(User, name, method, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return calls
+
+    async def test_acreate_uses_async_api(self):
+        calls = self.mock_async_method(
+            "aget_all_permissions", return_value={"tests.change_contact_notes"}
+        )
+        with mock.patch.object(User, "get_all_permissions") as get_all_permissions:
+            form = await ContactForm.acreate(for_user=self.bob)
+
+        self.assertEqual(calls, [()])
+        get_all_permissions.assert_not_called()
+        self.assertEqual(list(form.fields), ["name", "notes"])
+
+    async def test_acreate_with_has_perm_resolver(self):
+        class HasPermContactForm(ContactForm):
+            class Meta:
+                field_permissions = ContactForm.Meta.field_permissions
+                permission_resolver = PermissionResolver()
+
+        calls = self.mock_async_method(
+            "ahas_perm", side_effect=lambda perm: perm == "tests.change_contact_notes"
+        )
+        form = await HasPermContactForm.acreate(for_user=self.bob)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(form.fields), ["name", "notes"])
+
+    async def test_acreate_with_custom_sync_resolver(self):
+        class NotesOnlyResolver(PermissionResolver):
+            def get_granted_permissions(self, user, permissions, obj=None):
+                return {perm for perm in permissions if perm.endswith("_notes")}
+
+        class NotesForm(ContactForm):
+            class Meta:
+                field_permissions = ContactForm.Meta.field_permissions
+                permission_resolver = NotesOnlyResolver()
+
+        form = await NotesForm.acreate(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name", "notes"])
+
+    async def test_acreate_with_permission_cache(self):
+        calls = self.mock_async_method("aget_all_permissions", return_value=set())
+        with permission_cache():
+            await ContactForm.acreate(for_user=self.bob)
+            await ContactForm.acreate(for_user=self.bob)
+
+        self.assertEqual(len(calls), 1)
+
+
+class PermissionedFormSetTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.bob.user_permissions.add(
+            Permission.objects.get(codename="change_country_description")
+        )
+
+    def test_formset(self):
+        ContactFormSet = permissioned_formset_factory(ContactForm, extra=3)
+        with mock.patch.object(
+            User,
+            "get_all_permissions",
+            autospec=True,
+            return_value={"tests.change_contact_notes"},
+        ) as get_all_permissions:
+            formset = ContactFormSet(for_user=self.bob)
+            forms = formset.forms
+            empty_form = formset.empty_form
+
+        get_all_permissions.assert_called_once()
+        self.assertEqual(len(forms), 3)
+        for form in forms + [empty_form]:
+            self.assertEqual(list(form.fields), ["name", "notes"])
+
+    def test_shared_granted_permissions(self):
+        with mock.patch.object(
+            User,
+            "get_all_permissions",
+            autospec=True,
+            return_value={"tests.change_contact_notes"},
+        ) as get_all_permissions:
+            granted_permissions = ContactForm.get_granted_permissions(self.bob)
+            forms = [
+                ContactForm(for_user=self.bob, granted_permissions=granted_permissions)
+                for _ in range(2)
+            ]
+
+        get_all_permissions.assert_called_once()
+        self.assertEqual(granted_permissions, {"tests.change_contact_notes"})
+        for form in forms:
+            self.assertEqual(list(form.fields), ["name", "notes"])
+
+    def test_formset_without_user(self):
+        ContactFormSet = permissioned_formset_factory(ContactForm, extra=2)
+        formset = ContactFormSet()
+        for form in formset.forms + [formset.empty_form]:
+            self.assertEqual(list(form.fields), ["name", "email", "phone", "notes"])
+
+    def test_bound_formset(self):
+        ContactFormSet = permissioned_formset_factory(ContactForm)
+        formset = ContactFormSet(
+            {
+                "form-TOTAL_FORMS": "2",
+                "form-INITIAL_FORMS": "0",
+                "form-0-name": "Ziggy",
+                "form-0-email": "not an email address",
+                "form-1-name": "Aladdin",
+            },
+            for_user=self.bob,
+        )
+        self.assertTrue(formset.is_valid())
+        self.assertEqual(formset.cleaned_data, [{"name": "Ziggy"}, {"name": "Aladdin"}])
+
+    def test_model_formset(self):
+        Country.objects.create(name="Ukraine", description="Blue and yellow")
+        Country.objects.create(name="Sweden", description="Flatpack furniture")
+        CountryFormSet = permissioned_modelformset_factory(
+            Country, form=CountryForm, extra=1
+        )
+        alice = User.objects.create_user("alice", "alice@example.com", "password")
+
+        with self.assertNumQueries(3):
+            # One query for the queryset, and two for the user's permissions
+            formset = CountryFormSet(for_user=alice)
+            forms = formset.forms
+        self.assertEqual(len(forms), 3)
+        for form in forms + [formset.empty_form]:
+            self.assertEqual(list(form.fields), ["name", "id"])
+
+        formset = CountryFormSet(for_user=self.bob)
+        for form in formset.forms + [formset.empty_form]:
+            self.assertEqual(list(form.fields), ["name", "description", "id"])
+
 
 class PermissionedModelFormTest(TestCase):
     def setUp(self):
@@ -263,6 +1226,709 @@ class PermissionedModelFormTest(TestCase):
         )
 
 
+class NameBasedResolver(PermissionResolver):
+    """
+    Grants permissions on countries whose name begins with a U, recording the batches of objects
+    it is asked about
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def get_granted_permissions(self, user, permissions, obj=None):
+        if obj is not None and obj.name.startswith("U"):
+            return set(permissions)
+        return set()
+
+    def get_granted_permissions_for_objects(self, user, permissions, objs):
+        self.batches.append(objs)
+        return super().get_granted_permissions_for_objects(user, permissions, objs)
+
+
+class ObjectPermissionTest(TestCase):
+    def setUp(self):
+        self.resolver = NameBasedResolver()
+
+        class ObjectCountryForm(CountryForm):
+            class Meta:
+                model = Country
+                fields = ["name", "description"]
+                field_permissions = CountryForm.Meta.field_permissions
+                permission_resolver = self.resolver
+                object_permissions = True
+
+        self.form_class = ObjectCountryForm
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.ukraine = Country.objects.create(name="Ukraine")
+        self.sweden = Country.objects.create(name="Sweden")
+
+    def test_form(self):
+        form = self.form_class(instance=self.ukraine, for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name", "description"])
+        form = self.form_class(instance=self.sweden, for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_object_permissions_not_used_by_default(self):
+        class GlobalCountryForm(CountryForm):
+            class Meta:
+                model = Country
+                fields = ["name", "description"]
+                field_permissions = CountryForm.Meta.field_permissions
+                permission_resolver = self.resolver
+
+        form = GlobalCountryForm(instance=self.ukraine, for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_memoized_per_object(self):
+        with permission_cache():
+            ukraine_form = self.form_class(instance=self.ukraine, for_user=self.bob)
+            sweden_form = self.form_class(instance=self.sweden, for_user=self.bob)
+        self.assertEqual(list(ukraine_form.fields), ["name", "description"])
+        self.assertEqual(list(sweden_form.fields), ["name"])
+
+    def test_model_formset(self):
+        CountryFormSet = permissioned_modelformset_factory(
+            Country, form=self.form_class, extra=1
+        )
+        formset = CountryFormSet(
+            queryset=Country.objects.order_by("name"), for_user=self.bob
+        )
+        forms = formset.forms
+        self.assertEqual(len(self.resolver.batches), 1)
+        self.assertEqual(self.resolver.batches[0], [self.sweden, self.ukraine])
+        self.assertEqual(list(forms[0].fields), ["name", "id"])
+        self.assertEqual(list(forms[1].fields), ["name", "description", "id"])
+        self.assertEqual(list(forms[2].fields), ["name", "id"])
+
+    def test_bound_model_formset(self):
+        CountryFormSet = permissioned_modelformset_factory(
+            Country, form=self.form_class, extra=0
+        )
+        formset = CountryFormSet(
+            {
+                "form-TOTAL_FORMS": "2",
+                "form-INITIAL_FORMS": "2",
+                "form-0-id": str(self.sweden.pk),
+                "form-0-name": "Sweden",
+                "form-0-description": "Flatpack furniture",
+                "form-1-id": str(self.ukraine.pk),
+                "form-1-name": "Ukraine",
+                "form-1-description": "Blue and yellow",
+            },
+            queryset=Country.objects.order_by("name"),
+            for_user=self.bob,
+        )
+        self.assertTrue(formset.is_valid())
+        formset.save()
+        self.sweden.refresh_from_db()
+        self.ukraine.refresh_from_db()
+        self.assertEqual(self.sweden.description, "")
+        self.assertEqual(self.ukraine.description, "Blue and yellow")
+        self.assertEqual(len(self.resolver.batches), 1)
+
+
+class DisableDeniedFieldsTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.country = Country.objects.create(
+            name="Ukraine", description="Blue and yellow"
+        )
+
+    def test_disable_all_denied_fields(self):
+        class DisabledContactForm(ContactForm):
+            class Meta:
+                disable_denied_fields = True
+
+        form = DisabledContactForm(
+            {
+                "name": "Ziggy",
+                "email": "ziggy@example.com",
+                "phone": "555",
+                "notes": "Spider from Mars",
+            },
+            initial={"phone": "123"},
+            for_user=self.bob,
+        )
+        self.assertEqual(list(form.fields), ["name", "email", "phone", "notes"])
+        self.assertEqual(
+            [name for name, field in form.fields.items() if field.disabled],
+            ["email", "phone", "notes"],
+        )
+        self.assertFalse(DisabledContactForm.base_fields["email"].disabled)
+        self.assertInHTML(
+            '<input type="text" name="phone" value="123" disabled id="id_phone">',
+            form.as_p(),
+        )
+        self.assertTrue(form.is_valid())
+        # disabled fields take their initial values, as in Django
+        self.assertEqual(
+            form.cleaned_data,
+            {"name": "Ziggy", "email": "", "phone": "123", "notes": ""},
+        )
+
+    def test_disable_selected_fields(self):
+        class PartlyDisabledContactForm(ContactForm):
+            class Meta:
+                disable_denied_fields = ["notes"]
+
+        form = PartlyDisabledContactForm(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name", "notes"])
+        self.assertTrue(form.fields["notes"].disabled)
+
+        with mock.patch.object(
+            User, "get_all_permissions", return_value={"tests.change_contact_notes"}
+        ):
+            form = PartlyDisabledContactForm(for_user=self.bob)
+        self.assertFalse(form.fields["notes"].disabled)
+
+    def test_unknown_disabled_field(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "disable_denied_fields for TypoContactForm refers to field(s) without "
+            "field_permissions: name, nots",
+        ):
+
+            class TypoContactForm(ContactForm):
+                class Meta:
+                    disable_denied_fields = ["notes", "nots", "name"]
+
+    def test_model_form_does_not_save_disabled_fields(self):
+        class DisabledCountryForm(CountryForm):
+            class Meta(CountryForm.Meta):
+                disable_denied_fields = True
+
+        form = DisabledCountryForm(
+            {"name": "Ukraine", "description": "Something else"},
+            instance=self.country,
+            for_user=self.bob,
+        )
+        self.assertTrue(form.fields["description"].disabled)
+        self.assertInHTML(
+            '<textarea name="description" cols="40" rows="10" disabled id="id_description">'
+            "Blue and yellow</textarea>",
+            form.as_p(),
+        )
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["description"], "Blue and yellow")
+        with mock.patch.object(
+            Country._meta.get_field("description"), "save_form_data"
+        ) as save_form_data:
+            form.save()
+        save_form_data.assert_not_called()
+        self.country.refresh_from_db()
+        self.assertEqual(self.country.description, "Blue and yellow")
+
+    def test_model_form_validates_disabled_fields(self):
+        class DisabledNameCountryForm(CountryForm):
+            class Meta(CountryForm.Meta):
+                field_permissions = {"name": "tests.change_country_description"}
+                disable_denied_fields = True
+
+            def clean(self):
+                cleaned_data = super().clean()
+                self.clean_name_seen = cleaned_data["name"]
+                return cleaned_data
+
+        form = DisabledNameCountryForm(
+            {"name": "Something else", "description": "Something else"},
+            instance=self.country,
+            initial={"name": "Ruritania"},
+            for_user=self.bob,
+        )
+        with mock.patch.object(Country, "validate_unique") as validate_unique:
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.clean_name_seen, "Ruritania")
+        self.assertEqual(form.cleaned_data["name"], "Ruritania")
+        # disabled fields are not excluded from unique checks...
+        self.assertNotIn("name", validate_unique.call_args[1]["exclude"])
+        # ...but their values are not written to the instance
+        self.assertEqual(form.instance.name, "Ukraine")
+        form.save()
+        self.country.refresh_from_db()
+        self.assertEqual(self.country.name, "Ukraine")
+        self.assertEqual(self.country.description, "Blue and yellow")
+
+
+class FormPermissionsAppliedSignalTest(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.calls = []
+        ContactForm._meta.field_layout_cache.clear()
+
+    def receiver(self, **kwargs):
+        self.calls.append(kwargs)
+
+    def test_signal(self):
+        form_permissions_applied.connect(self.receiver)
+        try:
+            with mock.patch.object(
+                User, "get_all_permissions", return_value={"tests.change_contact_notes"}
+            ):
+                first_form = ContactForm(for_user=self.bob)
+                ContactForm(for_user=self.bob)
+            ContactForm()
+        finally:
+            form_permissions_applied.disconnect(self.receiver)
+
+        self.assertEqual(len(self.calls), 2)
+        call = self.calls[0]
+        self.assertIs(call["sender"], ContactForm)
+        self.assertIs(call["form"], first_form)
+        self.assertIs(call["user"], self.bob)
+        self.assertEqual(call["permission_checks"], 2)
+        self.assertEqual(call["removed_fields"], ["email", "phone"])
+        self.assertEqual(call["disabled_fields"], [])
+        self.assertIs(call["layout_cache_hit"], False)
+        self.assertGreaterEqual(call["duration"], 0)
+        self.assertIs(self.calls[1]["layout_cache_hit"], True)
+
+    def test_formset_forms_report_no_permission_checks(self):
+        ContactFormSet = permissioned_formset_factory(ContactForm, extra=2)
+        form_permissions_applied.connect(self.receiver)
+        try:
+            ContactFormSet(for_user=self.bob).forms
+        finally:
+            form_permissions_applied.disconnect(self.receiver)
+
+        self.assertEqual(len(self.calls), 2)
+        for call in self.calls:
+            self.assertEqual(call["permission_checks"], 0)
+            self.assertEqual(call["removed_fields"], ["email", "phone", "notes"])
+
+    def test_memoized_permissions_not_counted(self):
+        form_permissions_applied.connect(self.receiver)
+        try:
+            with permission_cache():
+                ContactForm(for_user=self.bob)
+                ContactForm(for_user=self.bob)
+        finally:
+            form_permissions_applied.disconnect(self.receiver)
+
+        self.assertEqual(
+            [call["permission_checks"] for call in self.calls],
+            [2, 0],
+        )
+
+    def test_no_overhead_without_receivers(self):
+        with mock.patch("permissionedforms.forms.time.perf_counter") as perf_counter:
+            ContactForm(for_user=self.bob)
+        perf_counter.assert_not_called()
+
+
+class ModelFormOptionsTest(TestCase):
+    def test_model_form_options_built_once(self):
+        with mock.patch.object(
+            forms.models.ModelFormOptions,
+            "__init__",
+            autospec=True,
+            side_effect=forms.models.ModelFormOptions.__init__,
+        ) as init:
+
+            class SingleCountryForm(PermissionedModelForm):
+                class Meta:
+                    model = Country
+                    fields = ["name", "description"]
+                    field_permissions = {
+                        "description": "tests.change_country_description"
+                    }
+
+        init.assert_called_once()
+        self.assertEqual(SingleCountryForm._meta.fields, ["name", "description"])
+        self.assertEqual(
+            SingleCountryForm._meta.field_permission_index.permissions,
+            {"tests.change_country_description"},
+        )
+
+    def test_all_fields(self):
+        class AllCountryForm(PermissionedModelForm):
+            class Meta:
+                model = Country
+                fields = "__all__"
+                field_permissions = {"description": "tests.change_country_description"}
+
+        self.assertIsNone(AllCountryForm._meta.fields)
+        country = Country.objects.create(name="Ukraine")
+        form = AllCountryForm(
+            {"name": "France", "description": "Baguettes"}, instance=country
+        )
+        self.assertTrue(form.is_valid())
+        form.save()
+        country.refresh_from_db()
+        self.assertEqual(country.name, "France")
+        self.assertEqual(country.description, "Baguettes")
+
+    def test_options_mixin_without_init_options(self):
+        class ExtraOptionMixin:
+            def __init__(self, options=None):
+                super().__init__(options)
+                self.extra_option = getattr(options, "extra_option", None)
+
+        class ExtraOptions(ExtraOptionMixin, PermissionedModelFormOptions):
+            pass
+
+        class ExtraMetaclass(PermissionedModelFormMetaclass):
+            options_class = ExtraOptions
+
+        class ExtraCountryForm(PermissionedModelForm, metaclass=ExtraMetaclass):
+            class Meta:
+                model = Country
+                fields = "__all__"
+                field_permissions = {"description": "tests.change_country_description"}
+                extra_option = "extra"
+
+        self.assertEqual(ExtraCountryForm._meta.extra_option, "extra")
+        # adjustments made by ModelFormMetaclass are kept
+        self.assertIsNone(ExtraCountryForm._meta.fields)
+        self.assertEqual(
+            ExtraCountryForm._meta.field_permission_index.permissions,
+            {"tests.change_country_description"},
+        )
+
+    def test_unrelated_base_options_rebuilt(self):
+        class UnrelatedOptions:
+            def __init__(self):
+                self.unrelated_option = True
+
+        class UnrelatedMetaclass(OptionCollectingMetaclass):
+            options_class = PermissionedFormOptions
+
+        attrs = {"_meta": UnrelatedOptions()}
+        new_class = type.__new__(UnrelatedMetaclass, "Unrelated", (), attrs)
+        opts = UnrelatedMetaclass.build_options(new_class)
+        self.assertIsInstance(opts, PermissionedFormOptions)
+        self.assertFalse(hasattr(opts, "unrelated_option"))
+
+    def test_cluster_form_options(self):
+        self.assertEqual(TaggedPageForm._meta.formsets, ["tags"])
+        self.assertEqual(TaggedPageForm._meta.fields, ["title", "body"])
+        self.assertEqual(
+            dict(TaggedPageForm._meta.formset_permissions),
+            {"tags": "tests.change_page_tags"},
+        )
+
+
+class PermissionedModelFormFactoryTest(TestCase):
+    def setUp(self):
+        modelform_class_cache.clear()
+
+    def test_factory(self):
+        form_class = permissioned_modelform_factory(
+            Country,
+            fields=["name", "description"],
+            field_permissions={"description": "tests.change_country_description"},
+            labels={"name": "Country name"},
+        )
+        self.assertTrue(issubclass(form_class, PermissionedModelForm))
+        self.assertEqual(form_class.__name__, "CountryForm")
+        self.assertEqual(form_class.base_fields["name"].label, "Country name")
+
+        bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.assertEqual(list(form_class(for_user=bob).fields), ["name"])
+
+    def test_classes_are_memoized(self):
+        def make_form_class():
+            return permissioned_modelform_factory(
+                Country,
+                fields=["name", "description"],
+                field_permissions={"description": "tests.change_country_description"},
+                widgets={"description": forms.Textarea},
+            )
+
+        form_class = make_form_class()
+        self.assertIs(make_form_class(), form_class)
+        self.assertEqual(modelform_class_cache.cache_info().hits, 1)
+        self.assertIsNot(
+            permissioned_modelform_factory(Country, fields=["name"]), form_class
+        )
+
+    def test_inherits_form_meta(self):
+        form_class = permissioned_modelform_factory(
+            Country,
+            form=CountryForm,
+            field_permissions={"name": "tests.change_country_description"},
+        )
+        self.assertEqual(list(form_class.base_fields), ["name", "description"])
+        self.assertEqual(
+            dict(form_class._meta.field_permissions),
+            {
+                "name": "tests.change_country_description",
+                "description": "tests.change_country_description",
+            },
+        )
+
+    def test_unhashable_arguments_bypass_cache(self):
+        class Unhashable:
+            __hash__ = None
+
+        form_class = permissioned_modelform_factory(
+            Country, fields=["name"], labels={"name": Unhashable()}
+        )
+        self.assertEqual(list(form_class.base_fields), ["name"])
+        self.assertEqual(len(modelform_class_cache), 0)
+
+    def test_fields_or_exclude_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            permissioned_modelform_factory(Country)
+
+
+class WarmUpTest(TestCase):
+    def test_registry(self):
+        self.assertIn(ContactForm, form_class_registry)
+        self.assertIn(CountryForm, form_class_registry)
+        self.assertIn(TaggedPageForm, form_class_registry)
+
+        class TemporaryForm(PermissionedForm):
+            pass
+
+        self.assertIn(TemporaryForm, form_class_registry)
+
+    def test_warm_up(self):
+        ContactForm._meta.field_layout_cache.clear()
+        form_classes = warm_up()
+        self.assertIn(ContactForm, form_classes)
+        self.assertEqual(len(ContactForm._meta.field_layout_cache), 2)
+
+    def test_find_unknown_permissions(self):
+        with self.assertNumQueries(1):
+            unknown_permissions = find_unknown_permissions(
+                [ContactForm, CountryForm, TaggedPageForm]
+            )
+        self.assertEqual(
+            unknown_permissions,
+            {
+                ContactForm: [
+                    "tests.change_contact_notes",
+                    "tests.view_contact_details",
+                ]
+            },
+        )
+
+    def test_management_command(self):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command("warm_up_permissionedforms", stdout=stdout, stderr=stderr)
+        self.assertIn("Warmed up", stdout.getvalue())
+        self.assertIn(
+            "tests.forms.ContactForm refers to unknown permission(s): "
+            "tests.change_contact_notes, tests.view_contact_details",
+            stderr.getvalue(),
+        )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "warm_up_permissionedforms", "--strict", stdout=stdout, stderr=stderr
+            )
+
+
+class GroupPermissionResolverTest(TestCase):
+    def setUp(self):
+        group_permission_masks.clear()
+
+        class GroupCountryForm(CountryForm):
+            class Meta(CountryForm.Meta):
+                permission_resolver = GroupPermissionResolver()
+
+        self.form_class = GroupCountryForm
+        self.editors = Group.objects.create(name="Editors")
+        self.editors.permissions.add(
+            Permission.objects.get(codename="change_country_description")
+        )
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.bob.groups.add(self.editors)
+        self.bill = User.objects.create_user("bill", "bill@example.com", "password")
+        self.bill.groups.add(self.editors)
+
+    def test_group_permissions(self):
+        with self.assertNumQueries(2):
+            form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name", "description"])
+
+        # group permissions are now cached, so only group membership is queried
+        with self.assertNumQueries(1):
+            form = self.form_class(for_user=self.bill)
+        self.assertEqual(list(form.fields), ["name", "description"])
+
+        alice = User.objects.create_user("alice", "alice@example.com", "password")
+        form = self.form_class(for_user=alice)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_invalidated_on_group_permission_change(self):
+        self.form_class(for_user=self.bob)
+        self.assertEqual(len(group_permission_masks), 1)
+        self.editors.permissions.clear()
+        self.assertEqual(len(group_permission_masks), 0)
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_invalidated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editors.permissions.clear()
+            # masks reloaded before the change is committed
+            self.form_class(for_user=self.bob)
+            self.assertEqual(len(group_permission_masks), 1)
+        self.assertEqual(len(group_permission_masks), 0)
+
+    def test_group_membership_change(self):
+        self.form_class(for_user=self.bob)
+        self.bob.groups.remove(self.editors)
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+    def test_superuser_and_inactive_users(self):
+        superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        with self.assertNumQueries(0):
+            form = self.form_class(for_user=superuser)
+        self.assertEqual(list(form.fields), ["name", "description"])
+
+        self.bob.is_active = False
+        form = self.form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name"])
+
+
+class CountryAdmin(PermissionedModelAdminMixin, ModelAdmin):
+    form = CountryForm
+    fieldsets = [
+        (None, {"fields": ["name"]}),
+        ("Details", {"fields": ["description"]}),
+    ]
+
+
+class PermissionedModelAdminMixinTest(TestCase):
+    def setUp(self):
+        self.model_admin = CountryAdmin(Country, AdminSite())
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+
+    def get_request(self, user):
+        request = RequestFactory().get("/admin/tests/country/add/")
+        request.user = user
+        return request
+
+    def test_form_constructed_for_user(self):
+        forms_built = []
+
+        def changeform_view(request, *args):
+            form_class = self.model_admin.get_form(
+                request, fields=["name", "description"]
+            )
+            self.assertEqual(list(form_class.base_fields), ["name", "description"])
+            forms_built.append(form_class())
+            return HttpResponse()
+
+        with mock.patch.object(
+            ModelAdmin, "_changeform_view", side_effect=changeform_view
+        ):
+            self.model_admin.changeform_view(self.get_request(self.bob))
+        [form] = forms_built
+        self.assertEqual(list(form.fields), ["name"])
+        self.assertIsNone(current_admin_user.get())
+
+        form_class = self.model_admin.get_form(
+            self.get_request(self.bob), fields=["name", "description"]
+        )
+        form = form_class(for_user=self.superuser)
+        self.assertEqual(list(form.fields), ["name", "description"])
+
+    def test_get_form_returns_form_class(self):
+        class CustomisedCountryAdmin(CountryAdmin):
+            def get_form(self, request, obj=None, **kwargs):
+                Form = super().get_form(request, obj, **kwargs)
+
+                class CustomisedForm(Form):
+                    extra = forms.CharField()
+
+                return CustomisedForm
+
+        model_admin = CustomisedCountryAdmin(Country, AdminSite())
+        form_class = model_admin.get_form(self.get_request(self.bob))
+        self.assertTrue(issubclass(form_class, CountryForm))
+        self.assertEqual(list(form_class.base_fields), ["name", "extra"])
+        form = form_class(for_user=self.bob)
+        self.assertEqual(list(form.fields), ["name", "extra"])
+
+    def test_fieldsets_filtered(self):
+        request = self.get_request(self.bob)
+        self.assertEqual(
+            self.model_admin.get_fieldsets(request), [(None, {"fields": ["name"]})]
+        )
+        form_class = self.model_admin.get_form(request)
+        self.assertEqual(list(form_class.base_fields), ["name"])
+
+        request = self.get_request(self.superuser)
+        self.assertEqual(
+            self.model_admin.get_fieldsets(request), CountryAdmin.fieldsets
+        )
+
+    def test_fields_displayed_on_one_line(self):
+        class OneLineCountryAdmin(CountryAdmin):
+            fieldsets = [(None, {"fields": [("name", "description")]})]
+
+        model_admin = OneLineCountryAdmin(Country, AdminSite())
+        self.assertEqual(
+            model_admin.get_fieldsets(self.get_request(self.bob)),
+            [(None, {"fields": [("name",)]})],
+        )
+
+    def test_form_classes_cached(self):
+        # get_form looks up the form class for get_fieldsets, then for the fieldsets found
+        form_class = self.model_admin.get_form(self.get_request(self.bob))
+        self.assertEqual(self.model_admin.form_class_cache.cache_info().misses, 2)
+        self.assertIs(self.model_admin.get_form(self.get_request(self.bob)), form_class)
+        self.assertEqual(self.model_admin.form_class_cache.cache_info().hits, 2)
+
+        # a user with different permissions gets a different form class
+        superuser_form_class = self.model_admin.get_form(
+            self.get_request(self.superuser)
+        )
+        self.assertIsNot(superuser_form_class, form_class)
+        self.assertEqual(
+            list(superuser_form_class.base_fields), ["name", "description"]
+        )
+
+    def test_formfield_hooks_cached_per_user(self):
+        class UserHelpTextCountryAdmin(CountryAdmin):
+            def formfield_for_dbfield(self, db_field, request, **kwargs):
+                formfield = super().formfield_for_dbfield(db_field, request, **kwargs)
+                if db_field.name == "name":
+                    formfield.help_text = "Edited by %s" % request.user.username
+                return formfield
+
+        model_admin = UserHelpTextCountryAdmin(Country, AdminSite())
+        bill = User.objects.create_user("bill", "bill@example.com", "password")
+        for user in [self.bob, bill]:
+            form_class = model_admin.get_form(self.get_request(user))
+            self.assertEqual(
+                form_class.base_fields["name"].help_text,
+                "Edited by %s" % user.username,
+            )
+
+    def test_request_not_kept_by_cached_form_class(self):
+        request = self.get_request(self.bob)
+        self.model_admin.get_form(request)
+        request_ref = weakref.ref(request)
+        del request
+        gc.collect()
+        self.assertIsNone(request_ref())
+        self.assertEqual(len(self.model_admin.form_class_cache), 2)
+
+    def test_form_cache_key_none(self):
+        class UncachedCountryAdmin(CountryAdmin):
+            def get_form_cache_key(self, request, obj=None, change=False, **kwargs):
+                return None
+
+        model_admin = UncachedCountryAdmin(Country, AdminSite())
+        request = self.get_request(self.bob)
+        form_class = model_admin.get_form(request)
+        self.assertIsNot(model_admin.get_form(request), form_class)
+        self.assertEqual(len(model_admin.form_class_cache), 0)
+
+
 class PermissionedClusterFormTest(TestCase):
     def setUp(self):
         self.page = Page.objects.create(
@@ -334,3 +2000,199 @@ class PermissionedClusterFormTest(TestCase):
         self.assertEqual(self.page.title, "Sheep")
         self.assertEqual(self.page.body, "And did those teeth in ancient time")
         self.assertEqual(self.page.tags.first().tag, "Dentistry")
+
+
+class FormsetPermissionsTest(TestCase):
+    def setUp(self):
+        self.page = Page.objects.create(
+            title="Sheep", body="And did those sheep in ancient time"
+        )
+        PageTag.objects.create(page=self.page, tag="Wool")
+        self.page_data = {
+            "title": "Teeth",
+            "body": "And did those teeth in ancient time",
+            "tags-TOTAL_FORMS": "1",
+            "tags-INITIAL_FORMS": "0",
+            "tags-MIN_NUM_FORMS": "0",
+            "tags-MAX_NUM_FORMS": "1000",
+            "tags-0-tag": "Dentistry",
+            "tags-0-id": "",
+        }
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        # populate bob's permission cache
+        self.bob.get_all_permissions()
+
+    def test_form_without_user(self):
+        form = TaggedPageForm(instance=self.page)
+        self.assertIn("tags", form.formsets)
+
+    def test_form_for_user_with_permission(self):
+        self.bob.user_permissions.add(
+            Permission.objects.get(codename="change_page_tags")
+        )
+        bob = User.objects.get(pk=self.bob.pk)
+        form = TaggedPageForm(instance=self.page, for_user=bob)
+        self.assertNotIn("title", form.fields)
+        self.assertIn("tags", form.formsets)
+        self.assertEqual(len(form.formsets["tags"].forms), 4)
+
+    def test_unbound_form_for_user_without_permission(self):
+        with self.assertNumQueries(0):
+            form = TaggedPageForm(instance=self.page, for_user=self.bob)
+            form_html = form.as_p()
+        self.assertNotIn("title", form.fields)
+        self.assertEqual(form.formsets, {})
+        self.assertNotIn("tags-TOTAL_FORMS", form_html)
+
+    def test_bound_form_for_user_without_permission(self):
+        form = TaggedPageForm(self.page_data, instance=self.page, for_user=self.bob)
+        self.assertEqual(form.formsets, {})
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(self.page.body, "And did those teeth in ancient time")
+        self.assertEqual(list(self.page.tags.values_list("tag", flat=True)), ["Wool"])
+
+    def test_unknown_formset(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "formset_permissions for BadPageForm refers to unknown formset(s): labels",
+        ):
+
+            class BadPageForm(PermissionedClusterForm):
+                class Meta:
+                    model = Page
+                    fields = ["title"]
+                    formsets = ["tags"]
+                    formset_permissions = {"labels": "tests.change_page_tags"}
+
+
+class ThreadSafetyTest(TestCase):
+    THREAD_COUNT = 8
+
+    def setUp(self):
+        # Switch threads as often as possible, to make interleavings more likely
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def run_in_threads(self, func):
+        barrier = threading.Barrier(self.THREAD_COUNT)
+
+        def run(thread_index):
+            barrier.wait()
+            return func(thread_index)
+
+        with ThreadPoolExecutor(max_workers=self.THREAD_COUNT) as executor:
+            return list(executor.map(run, range(self.THREAD_COUNT)))
+
+    def test_compiled_options_are_immutable(self):
+        index = ContactForm._meta.field_permission_index
+        with self.assertRaises(TypeError):
+            index.fields_by_permission["tests.change_contact_notes"] = frozenset()
+        with self.assertRaises(TypeError):
+            ContactForm._meta.field_permissions["name"] = "tests.change_contact_name"
+        self.assertIsInstance(index.permissions, frozenset)
+        self.assertIsInstance(ContactForm._meta.required_permissions, frozenset)
+
+        class DisablingContactForm(ContactForm):
+            class Meta:
+                disable_denied_fields = ["notes"]
+
+        self.assertEqual(
+            DisablingContactForm._meta.disable_denied_fields, frozenset(["notes"])
+        )
+
+    def test_concurrent_instantiation(self):
+        class SmallCacheContactForm(ContactForm):
+            class Meta:
+                # smaller than the number of distinct layouts, to force evictions
+                field_layout_cache_size = 1
+
+        users = [
+            BenchmarkUser(1, []),
+            BenchmarkUser(2, ["tests.view_contact_details"]),
+            BenchmarkUser(
+                3,
+                [
+                    "tests.view_contact_details",
+                    "tests.change_contact_notes",
+                    "tests.change_country_description",
+                ],
+            ),
+        ]
+        cases = [
+            (SmallCacheContactForm, users[0], ["name"]),
+            (SmallCacheContactForm, users[1], ["name", "email", "phone"]),
+            (SmallCacheContactForm, users[2], ["name", "email", "phone", "notes"]),
+            (ContactForm, users[1], ["name", "email", "phone"]),
+            (CountryForm, users[0], ["name"]),
+            (CountryForm, users[2], ["name", "description"]),
+        ]
+
+        def instantiate_forms(thread_index):
+            mismatches = []
+            for i in range(300):
+                form_class, user, expected_fields = cases[
+                    (thread_index + i) % len(cases)
+                ]
+                fields = list(form_class(for_user=user).fields)
+                if fields != expected_fields:
+                    mismatches.append((form_class.__name__, user.pk, fields))
+            return mismatches
+
+        results = self.run_in_threads(instantiate_forms)
+        self.assertEqual(results, [[]] * self.THREAD_COUNT)
+        self.assertLessEqual(len(SmallCacheContactForm._meta.field_layout_cache), 1)
+
+    def test_concurrent_lru_cache_access(self):
+        lru_cache = LRUCache(maxsize=4)
+
+        def use_cache(thread_index):
+            wrong_values = []
+            for i in range(2000):
+                key = (thread_index * 7 + i) % 16
+                value = lru_cache.get(key)
+                if value is None:
+                    lru_cache.set(key, "value-%d" % key)
+                elif value != "value-%d" % key:
+                    wrong_values.append((key, value))
+                if i % 500 == 0:
+                    lru_cache.clear()
+            return wrong_values
+
+        results = self.run_in_threads(use_cache)
+        self.assertEqual(results, [[]] * self.THREAD_COUNT)
+        self.assertLessEqual(len(lru_cache), 4)
+
+
+class BenchmarkTest(TestCase):
+    def test_run_scenario(self):
+        for kind in ["form", "modelform", "clusterform"]:
+            results = list(run_scenario(Scenario(kind, 10, 0.5, 2), min_time=0))
+            self.assertEqual(
+                [result.measure for result in results],
+                ["instantiate", "is_valid", "as_p"],
+            )
+            for result in results:
+                self.assertEqual(result.denied_fields, 5)
+                self.assertGreater(result.time_per_call, 0)
+                self.assertGreater(result.allocated_per_call, 0)
+
+    def test_scenarios_deny_requested_ratio(self):
+        scenarios = list(get_scenarios(["form"], quick=True))
+        self.assertNotIn(Scenario("form", 10, 0.5, 1), scenarios)
+        for scenario in scenarios:
+            user = make_user(1, scenario.denied_ratio, scenario.permission_count)
+            self.assertEqual(
+                len(user.permissions),
+                scenario.permission_count * (1 - scenario.denied_ratio),
+            )
+
+    def test_run_concurrency_benchmark(self):
+        results = list(run_concurrency_benchmark([1, 2], calls_per_thread=10))
+        self.assertEqual([result[0] for result in results], [1, 2])
+        self.assertEqual(results[0][2], 1)
+        for thread_count, throughput, scaling in results:
+            self.assertGreater(throughput, 0)